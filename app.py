@@ -1,40 +1,55 @@
 import os
 import base64
+import hashlib
+import io
+import json
 import logging
-from flask import Flask, render_template, request, Response, jsonify, send_from_directory
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from flask import Flask, g, render_template, request, Response, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
-try:
-    from groq import Groq
-except Exception:
-    Groq = None
-import markdown
-from markupsafe import Markup
-
-# Try to use full model, fallback to lite model
-try:
-    from ml_model import get_analyzer
-except Exception:
-    from ml_model_lite import get_analyzer
-    from ml_model_lite import extract_features_for_ml
-import joblib
+
+# The analyzer backend (full TensorFlow or lite, chosen by ML_BACKEND) and
+# the groq/markdown packages are imported on first use, so the process can
+# serve /health and the React build without loading any of them
+import ml_backend
+from ml_backend import get_analyzer, features_from_findings, warmup as warmup_models, is_ready as models_ready
 from pathlib import Path
+from model_registry import ModelRegistry
+from result_cache import ResultCache, make_key
+from dicom_io import is_dicom, read_dicom
+from job_queue import JobQueue, MemoryJobStore, QueueFull, SQLiteJobStore
+import metrics
+from metrics import record_fallback, timed
+from profiling import ProfileStore, admin_authorized, request_id_from, sampled
+from compression import compress_response
+from static_assets import StaticManifest
 
 # Load environment variables from .env file
 load_dotenv()
 
 UPLOAD_FOLDER = "uploads"
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "dicom"}
+# Uploads are analyzed straight from memory; set PERSIST_UPLOADS=1 to also
+# keep a copy in UPLOAD_FOLDER (written in the background)
+PERSIST_UPLOADS = os.getenv("PERSIST_UPLOADS", "0").lower() in ("1", "true", "yes")
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "dicom", "dcm"}
 
 # Get absolute paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 REACT_BUILD_DIR = os.path.join(BASE_DIR, "frontend", "build")
 
-app = Flask(__name__, static_folder=os.path.join(REACT_BUILD_DIR, "static"), static_url_path="/static")
+# The React build (including /static) is served from StaticManifest below
+app = Flask(__name__, static_folder=None)
 CORS(app)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+if PERSIST_UPLOADS:
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+_persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-writer")
 
 # Configure basic logging
 logging.basicConfig(level=logging.INFO)
@@ -43,6 +58,91 @@ logging.basicConfig(level=logging.INFO)
 # having to type it into the UI every time. This is useful for local testing.
 ENV_GROQ_API_KEY = os.getenv("GROQ_API_KEY", "").strip()
 
+# GROQ_BASE_URL lets a local stub server stand in for the Groq API
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "").strip() or None
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+
+# Hedging: run the local models alongside Groq and answer with whichever
+# result is available once the latency budget has passed
+GROQ_HEDGE = os.getenv("GROQ_HEDGE", "0").lower() in ("1", "true", "yes")
+GROQ_LATENCY_BUDGET_MS = float(os.getenv("GROQ_LATENCY_BUDGET_MS", "3000"))
+
+_groq_client = None
+_groq_client_lock = threading.Lock()
+_groq_class = None
+
+# Model warm-up: "1" starts it in a background thread when the app is
+# imported, "post_fork" leaves it to the gunicorn post_fork hook, "0" keeps
+# lazy loading (and importing) on the first analysis request
+ML_WARMUP = os.getenv("ML_WARMUP", "1").lower()
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+# Separate pools so Groq calls that lost the race (and keep running until
+# GROQ_TIMEOUT) can never delay the local inference of later requests
+_groq_executor = ThreadPoolExecutor(max_workers=int(os.getenv("HEDGE_WORKERS", "8")), thread_name_prefix="hedge-groq")
+_ml_executor = ThreadPoolExecutor(max_workers=int(os.getenv("HEDGE_WORKERS", "8")), thread_name_prefix="hedge-ml")
+
+# /api/ml-analyze/batch: images per forward pass, and limits (zip members
+# are checked before they are read)
+BATCH_ANALYSIS_SIZE = int(os.getenv("ML_ANALYSIS_BATCH_SIZE", "16"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "1000"))
+BATCH_MAX_MEMBER_BYTES = int(float(os.getenv("BATCH_MAX_MEMBER_MB", "64")) * 1024 * 1024)
+
+# Background jobs (POST /api/jobs). JOB_WORKERS analyses run at once per
+# process and at most JOB_MAX_PENDING may be queued or running. Jobs not
+# started within JOB_TTL seconds expire; results are kept JOB_RESULT_TTL
+# seconds. JOBS_BACKEND=sqlite stores jobs in JOBS_DB so any gunicorn
+# worker can answer a status poll; "memory" only suits a single process.
+JOBS_BACKEND = os.getenv("JOBS_BACKEND", "memory").lower()
+job_queue = JobQueue(
+    SQLiteJobStore(os.getenv("JOBS_DB", "jobs.sqlite3")) if JOBS_BACKEND == "sqlite" else MemoryJobStore(),
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("JOB_MAX_PENDING", "64")),
+    job_ttl=float(os.getenv("JOB_TTL", "600")),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", "3600")),
+)
+
+# Request profiling: PROFILE_SAMPLE_RATE of /api/ requests (0-1) run under
+# cProfile, and so does any request with X-Profile: 1 and the X-Admin-Token
+# header matching ADMIN_TOKEN. Profiles go to PROFILE_DIR (newest
+# PROFILE_MAX_FILES kept) and are listed at /admin/profiles.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+profile_store = ProfileStore(
+    os.getenv("PROFILE_DIR", "profiles"),
+    max_files=int(os.getenv("PROFILE_MAX_FILES", "200")),
+)
+
+# Trained sklearn classifier for the lite path, loaded once and hot-reloaded
+# whenever train_model.py writes a new artifact
+classifier_registry = ModelRegistry(Path("model.joblib"))
+
+# Cache of analysis results keyed by upload content. Set RESULT_CACHE_DIR to
+# share cached results between gunicorn workers on the same host. Entries
+# expire after RESULT_CACHE_TTL seconds and the disk tier is pruned back to
+# RESULT_CACHE_DISK_MAX_MB.
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", "256")),
+    disk_dir=os.getenv("RESULT_CACHE_DIR") or None,
+    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL", "86400")),
+    disk_max_bytes=int(float(os.getenv("RESULT_CACHE_DISK_MAX_MB", "512")) * 1024 * 1024),
+)
+
+# The React build is indexed once at startup (before gunicorn forks, with
+# preload_app) and served from memory with precompressed variants
+static_manifest = StaticManifest(
+    REACT_BUILD_DIR,
+    min_bytes=int(os.getenv("STATIC_COMPRESS_MIN_BYTES", "1024")),
+)
+
+# HTML renderers, compiled once
+ML_ANALYSIS_TEMPLATE = app.jinja_env.get_template("ml_analysis.html")
+LITE_ANALYSIS_TEMPLATE = app.jinja_env.get_template("lite_analysis.html")
+ML_ERROR_TEMPLATE = app.jinja_env.from_string(
+    "{% if plain %}<p style='color: red;'>{{ error }}</p>"
+    "{% else %}<p style='color: red;'><strong>Error:</strong> {{ error }}</p>{% endif %}"
+)
+
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -59,248 +159,822 @@ IMPORTANT: Format disease names in **bold** (e.g., **Pneumonia**, **Fracture**)
 Keep the explanation simple and direct. Avoid lengthy details and technical jargon. Focus only on the key observations and most likely diagnoses.
 """
 
-def encode_image(image_path):
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode('utf-8')
+GROQ_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+
+# Changing the prompt invalidates cached Groq results
+PROMPT_VERSION = hashlib.sha256(MEDICAL_QUERY.encode("utf-8")).hexdigest()[:12]
+
+# Bump when the cached ML or Groq result format changes
+ML_RESULT_VERSION = "2"
+GROQ_RESULT_VERSION = "2"
+
+# Accept this media type (or pass ?format=structured) to get the analysis
+# data without the rendered HTML
+STRUCTURED_MEDIA_TYPE = "application/vnd.mediscan.structured+json"
+
+# JSON/HTML responses of at least COMPRESS_MIN_BYTES are gzip/brotli encoded
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+
+def read_upload(file):
+    """Read the uploaded bytes, leaving the stream rewound for later readers"""
+    with timed("upload_read"):
+        file.stream.seek(0)
+        data = file.stream.read()
+        file.stream.seek(0)
+    return data
+
+def _write_upload(filepath, data):
+    try:
+        with timed("upload_save"), open(filepath, "wb") as f:
+            f.write(data)
+    except Exception as e:
+        logging.warning(f"Could not persist upload {filepath}: {e}")
+
+def persist_upload(filename, data):
+    """Save a copy of the upload in the background when PERSIST_UPLOADS is set"""
+    if not PERSIST_UPLOADS:
+        return None
+    # A unique prefix keeps concurrent uploads with the same name apart
+    filename = f"{uuid.uuid4().hex}_{secure_filename(filename)}"
+    filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    _persist_executor.submit(_write_upload, filepath, data)
+    return filepath
+
+def encode_image(image_data):
+    return base64.b64encode(image_data).decode('utf-8')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_id = request_id_from(request.headers.get("X-Request-ID"))
+    # Admins can force a profile of one request with X-Profile: 1
+    forced = request.headers.get("X-Profile") == "1" and admin_authorized(
+        request.headers.get("X-Admin-Token"), ADMIN_TOKEN
+    )
+    if forced or (sampled(PROFILE_SAMPLE_RATE) and request.path.startswith("/api/")):
+        g.profiler = profile_store.start()
+
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.REQUEST_SECONDS.labels(endpoint, request.method, str(response.status_code)).observe(elapsed)
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profile_store.finish(profiler, g.request_id, {
+                "method": request.method,
+                "endpoint": endpoint,
+                "status": response.status_code,
+                "duration_ms": elapsed * 1000,
+            })
+            response.headers["X-Profile-Id"] = g.request_id
+    response.headers["X-Request-ID"] = g.get("request_id", "")
+    if request.path.startswith("/api/"):
+        compress_response(response, request.accept_encodings, COMPRESS_MIN_BYTES, COMPRESS_LEVEL)
+    return response
+
+
+@app.teardown_request
+def stop_profiler(exc):
+    # Requests that raised never reach after_request
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+
+
+def require_admin():
+    """None if the request carries the admin token, else a 404 response"""
+    if not admin_authorized(request.headers.get("X-Admin-Token"), ADMIN_TOKEN):
+        # Indistinguishable from a missing route for non-admins
+        return jsonify({"error": "Not found"}), 404
+    return None
+
+
+@app.route("/admin/profiles", methods=["GET"])
+def list_profiles():
+    """Slowest recent request profiles (?limit=N, default 20)"""
+    denied = require_admin()
+    if denied is not None:
+        return denied
+    limit = request.args.get("limit", 20, type=int)
+    return jsonify({"profiles": profile_store.slowest(limit)}), 200
+
+
+@app.route("/admin/profiles/<profile_id>", methods=["GET"])
+def download_profile(profile_id):
+    """Raw cProfile dump, for pstats or snakeviz"""
+    denied = require_admin()
+    if denied is not None:
+        return denied
+    path = profile_store.path_for(profile_id)
+    if path is None:
+        return jsonify({"error": "Unknown profile"}), 404
+    return send_from_directory(os.path.abspath(profile_store.directory), os.path.basename(path),
+                               as_attachment=True, mimetype="application/octet-stream")
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus metrics, aggregated over all gunicorn workers"""
+    if not metrics.available():
+        return jsonify({"error": "prometheus_client is not installed"}), 501
+    body, content_type = metrics.exposition()
+    return Response(body, content_type=content_type)
+
 
 @app.route("/health", methods=["GET"])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({"status": "ok", "message": "Backend is running"}), 200
+    """Health check endpoint; "ready" flips once model warm-up has finished (with ML_WARMUP=0, once the models are built)"""
+    return jsonify({
+        "status": "ok",
+        "message": "Backend is running",
+        "ready": models_ready(),
+        "cache": result_cache.stats(),
+    }), 200
+
+
+def _run_warmup():
+    try:
+        warmup_models()
+        logging.info("Model warm-up finished")
+    except Exception:
+        logging.exception("Model warm-up failed")
+
+
+def start_warmup():
+    """Warm the models up in a background thread, once per process
+
+    Runs after fork under gunicorn (see gunicorn.conf.py): the TensorFlow
+    runtime is not fork-safe, so models are built in each worker.
+    """
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_run_warmup, name="model-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+def validate_upload():
+    """Return (file, None) for a valid image upload, or (None, error response)"""
+    if "image" not in request.files:
+        return None, (jsonify({"error": "No image file provided"}), 400)
+    
+    file = request.files["image"]
+    if file.filename == "":
+        return None, (jsonify({"error": "No selected file"}), 400)
+    
+    if not allowed_file(file.filename):
+        return None, (jsonify({"error": "Allowed image types are png, jpg, jpeg, dicom, dcm"}), 400)
+    
+    return file, None
+
+
+def groq_available():
+    """Import the groq package on first call; False if it is not installed"""
+    global _groq_class
+    if _groq_class is None:
+        try:
+            from groq import Groq
+            _groq_class = Groq
+        except Exception:
+            _groq_class = False
+    return _groq_class is not False
+
+
+def get_groq_client():
+    """Return the shared Groq client, creating it on first use
+
+    The client keeps its HTTP connection pool alive between requests, so
+    repeat calls skip the TCP/TLS handshake.
+    """
+    global _groq_client
+    if _groq_client is None:
+        with _groq_client_lock:
+            if _groq_client is None:
+                _groq_client = _groq_class(api_key=ENV_GROQ_API_KEY, base_url=GROQ_BASE_URL, timeout=GROQ_TIMEOUT)
+    return _groq_client
+
+
+def groq_cache_key(data):
+    return make_key(data, "groq", GROQ_MODEL, PROMPT_VERSION, GROQ_RESULT_VERSION)
+
+
+def run_groq_analysis(data):
+    """Analyze image bytes with Groq and return the response payload"""
+    cache_key = groq_cache_key(data)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    messages = groq_messages(data)
+    with timed("groq"):
+        chat_completion = get_groq_client().chat.completions.create(
+            messages=messages,
+            model=GROQ_MODEL,
+        )
+    payload = groq_payload(chat_completion.choices[0].message.content)
+    result_cache.set(cache_key, payload)
+    return payload
+
+
+def groq_messages(data):
+    """Chat messages asking Groq to analyze the image bytes"""
+    if is_dicom(data):
+        # The vision model only takes web formats; send the windowed first frame
+        data = read_dicom(data).to_jpeg()
+    base64_image = encode_image(data)
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": MEDICAL_QUERY},
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{base64_image}",
+                    },
+                },
+            ],
+        }
+    ]
+
+
+def groq_payload(markdown_result):
+    """Response payload for a complete Groq answer: rendered HTML plus the markdown"""
+    import markdown
+
+    with timed("format_html"):
+        result_html = markdown.markdown(markdown_result, extensions=["fenced_code", "tables"])
+    return {"result": result_html, "markdown": markdown_result}
+
+
+def without_html(payload):
+    """Structured form of a payload: everything but the rendered "result" HTML"""
+    return {key: value for key, value in payload.items() if key != "result"}
+
+
+def wants_structured():
+    """True if the client asked for structured JSON only (no HTML)"""
+    if request.args.get("format") == "structured":
+        return True
+    return any(mimetype == STRUCTURED_MEDIA_TYPE and quality > 0 for mimetype, quality in request.accept_mimetypes)
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_analysis(data):
+    """
+    Yield the analysis of image bytes as Server-Sent Events
+
+    Events:
+        token: {"text": ...} for each piece of Groq output as it arrives
+        fallback: {"error": ...} when Groq fails and the ML models take over
+        done: the same payload /api/analyze returns, plus "source"
+    """
+    # Sent straight away so the client sees the response start
+    yield ": analysis started\n\n"
+
+    if ENV_GROQ_API_KEY and groq_available():
+        cache_key = groq_cache_key(data)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            yield sse_event("done", {**cached, "source": "groq"})
+            return
+
+        parts = []
+        try:
+            started = time.perf_counter()
+            stream = get_groq_client().chat.completions.create(
+                messages=groq_messages(data),
+                model=GROQ_MODEL,
+                stream=True,
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    if not parts:
+                        metrics.STAGE_SECONDS.labels("groq_first_token").observe(time.perf_counter() - started)
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+            metrics.STAGE_SECONDS.labels("groq_stream").observe(time.perf_counter() - started)
+            payload = groq_payload("".join(parts))
+            result_cache.set(cache_key, payload)
+            yield sse_event("done", {**payload, "source": "groq"})
+            return
+        except Exception as groq_error:
+            logging.warning(f"Groq streaming failed, falling back to ML models: {groq_error}")
+            record_fallback("groq", "ml")
+            yield sse_event("fallback", {"error": str(groq_error)})
+
+    try:
+        yield sse_event("done", {**run_ml_analysis(data), "source": "ml"})
+    except Exception as e:
+        logging.exception("Error during streamed analysis")
+        yield sse_event("error", {"error": f"Error during analysis: {str(e)}"})
+
+
+def run_hedged_analysis(data, html=True):
+    """Race Groq against the local models
+
+    Both start at once. A Groq answer within GROQ_LATENCY_BUDGET_MS wins;
+    after that, whichever finishes first is returned. The loser keeps
+    running in the background only to fill the result cache.
+    """
+    groq_future = _groq_executor.submit(run_groq_analysis, data)
+    ml_future = _ml_executor.submit(run_ml_analysis, data, html=html)
+
+    # Groq has the whole budget to itself
+    done, _ = wait([groq_future], timeout=GROQ_LATENCY_BUDGET_MS / 1000.0)
+    if groq_future in done:
+        if groq_future.exception() is None:
+            ml_future.cancel()
+            return groq_future.result() if html else without_html(groq_future.result())
+        logging.warning(f"Groq analysis failed, using ML models: {groq_future.exception()}")
+    else:
+        logging.info("Groq exceeded latency budget, racing it against the ML models")
+
+    # Past the budget: return the first result that succeeded, and only
+    # raise when both failed
+    pending = {groq_future, ml_future}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in (groq_future, ml_future):
+            if future in done and future.exception() is None:
+                if future is ml_future:
+                    record_fallback("groq", "ml")
+                    return future.result()
+                return future.result() if html else without_html(future.result())
+    return ml_future.result()
+
+
+def run_analysis(data, html=True):
+    """
+    Analyze image bytes with Groq when configured, falling back to the ML models
+
+    Args:
+        data: Uploaded image bytes
+        html: Include the rendered "result" HTML (False for structured responses)
+    """
+    # Try Groq first if available
+    if ENV_GROQ_API_KEY and groq_available():
+        if GROQ_HEDGE:
+            return run_hedged_analysis(data, html=html)
+
+        try:
+            payload = run_groq_analysis(data)
+            return payload if html else without_html(payload)
+        except Exception as groq_error:
+            logging.warning(f"Groq analysis failed, falling back to ML models: {groq_error}")
+            record_fallback("groq", "ml")
+
+    # Fallback to ML models
+    return run_ml_analysis(data, html=html)
+
 
 @app.route("/api/analyze", methods=["POST"])
 def analyze_image():
     """Analyze image using Groq API or fallback to ML models"""
     try:
-        if "image" not in request.files:
-            return jsonify({"error": "No image file provided"}), 400
-        
-        file = request.files["image"]
-        if file.filename == "":
-            return jsonify({"error": "No selected file"}), 400
-        
-        if not allowed_file(file.filename):
-            return jsonify({"error": "Allowed image types are png, jpg, jpeg, dicom"}), 400
-
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        file.save(filepath)
-
-        # Try Groq first if available
-        groq_api_key = ENV_GROQ_API_KEY
-        if groq_api_key and Groq is not None:
-            try:
-                base64_image = encode_image(filepath)
-                client = Groq(api_key=groq_api_key)
-                
-                chat_completion = client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": MEDICAL_QUERY},
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{base64_image}",
-                                    },
-                                },
-                            ],
-                        }
-                    ],
-                    model="meta-llama/llama-4-scout-17b-16e-instruct",
-                )
-                markdown_result = chat_completion.choices[0].message.content
-                result_html = markdown.markdown(markdown_result, extensions=["fenced_code", "tables"])
-                return jsonify({"result": result_html}), 200
-            except Exception as groq_error:
-                logging.warning(f"Groq analysis failed, falling back to ML models: {groq_error}")
-        
-        # Fallback to ML models
-        return ml_analyze_image()
+        file, error_response = validate_upload()
+        if error_response is not None:
+            return error_response
+
+        data = read_upload(file)
+        persist_upload(file.filename, data)
+        return structured_or_html(dict(run_analysis(data, html=not wants_structured()), **multiframe_note(data)))
     
     except Exception as e:
         logging.exception("Error while performing analysis")
         return jsonify({"error": f"Error during analysis: {str(e)}"}), 500
 
 
+@app.route("/api/analyze/stream", methods=["POST"])
+def analyze_image_stream():
+    """Like /api/analyze, but streams Groq output as Server-Sent Events"""
+    file, error_response = validate_upload()
+    if error_response is not None:
+        return error_response
+
+    data = read_upload(file)
+    persist_upload(file.filename, data)
+    return Response(
+        stream_with_context(stream_analysis(data)),
+        mimetype="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/api/ml-analyze", methods=["POST"])
 def ml_analyze_image():
     """Analyze image using Deep Learning models (DenseNet + ResNet)"""
     try:
-        if "image" not in request.files:
-            return jsonify({"error": "No image file provided"}), 400
-        
-        file = request.files["image"]
-        if file.filename == "":
-            return jsonify({"error": "No selected file"}), 400
-        
-        if not allowed_file(file.filename):
-            return jsonify({"error": "Allowed image types are png, jpg, jpeg, dicom"}), 400
-
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        file.save(filepath)
-
-        # Get analyzer instance
-        analyzer = get_analyzer()
-
-        # If the analyzer provides an ensemble method (full ml_model), use it
-        if hasattr(analyzer, 'ensemble_analysis'):
-            analysis_result = analyzer.ensemble_analysis(filepath)
-            html_result = format_ml_analysis(analysis_result)
-            return jsonify({"result": html_result, "analysis": analysis_result}), 200
+        file, error_response = validate_upload()
+        if error_response is not None:
+            return error_response
 
-        # Fallback for lightweight analyzer: use analyze_image and optionally a saved classifier
-        findings = analyzer.analyze_image(filepath)
+        data = read_upload(file)
+        persist_upload(file.filename, data)
+        return structured_or_html(dict(run_ml_analysis(data, html=not wants_structured()), **multiframe_note(data)))
+    
+    except Exception as e:
+        logging.exception("Error during ML analysis")
+        return jsonify({"error": f"Error during analysis: {str(e)}"}), 500
 
-        # Try to load a trained sklearn model if available and run prediction using features
-        model_path = Path("model.joblib")
-        model_info = None
-        if model_path.exists():
+
+def dicom_frame_count(data):
+    """Number of frames if data is a readable DICOM file, else None"""
+    if not is_dicom(data):
+        return None
+    try:
+        return read_dicom(data).frame_count
+    except Exception:
+        return None
+
+
+def multiframe_note(data):
+    """
+    Fields flagging that only the first frame of a multi-frame DICOM was
+    analyzed (empty for everything else); the batch endpoint analyzes
+    every frame
+    """
+    frames = dicom_frame_count(data)
+    if frames is None or frames <= 1:
+        return {}
+    return {
+        "frames": frames,
+        "frames_analyzed": 1,
+        "warning": f"Only the first of {frames} frames was analyzed; "
+                   "POST the file to /api/ml-analyze/batch for one result per frame",
+    }
+
+
+def structured_or_html(payload):
+    """JSON response for a payload; Vary tells caches it depends on Accept"""
+    response = jsonify(payload)
+    response.vary.add("Accept")
+    return response, 200
+
+
+def ensemble_payload(analysis_result, html=True):
+    """Response payload for an ensemble result, rendering the HTML only if wanted"""
+    payload = {"analysis": analysis_result}
+    if html:
+        with timed("format_html"):
+            payload["result"] = format_ml_analysis(analysis_result)
+    return payload
+
+
+def ensemble_cache_key(data, analyzer):
+    # Cascade and full-ensemble results differ, so the mode is part of the key
+    mode = getattr(analyzer, "analysis_mode", "ensemble")
+    return make_key(data, "ensemble", ML_RESULT_VERSION, analyzer.model_version, mode)
+
+
+def cache_ensemble(cache_key, analysis_result):
+    # Only cache complete results so transient failures are retried
+    if "ensemble_confidence" in analysis_result:
+        result_cache.set(cache_key, analysis_result)
+
+
+def run_ml_analysis(data, html=True):
+    """
+    Analyze image bytes with the local models and return the response payload
+
+    The cache holds only the structured result; HTML is rendered per
+    response, and skipped entirely when html is False.
+    """
+    # Get analyzer instance
+    analyzer = get_analyzer()
+
+    # If the analyzer provides an ensemble method (full ml_model), use it
+    if hasattr(analyzer, 'ensemble_analysis'):
+        cache_key = ensemble_cache_key(data, analyzer)
+        analysis_result = result_cache.get(cache_key)
+        if analysis_result is None:
+            analysis_result = analyzer.ensemble_analysis(data)
+            cache_ensemble(cache_key, analysis_result)
+        return ensemble_payload(analysis_result, html)
+
+    # Try to load a trained sklearn model if available and run prediction using features
+    model_info = None
+    try:
+        clf, clf_sha256 = classifier_registry.get()
+    except Exception as e:
+        logging.exception('Error loading ML model')
+        clf, clf_sha256 = None, None
+        model_info = {"error": str(e)}
+
+    # The classifier version is part of the key so retraining invalidates results
+    cache_key = make_key(data, "lite", ML_RESULT_VERSION, clf_sha256 or "none")
+    structured = result_cache.get(cache_key)
+    if structured is None:
+        # Fallback for lightweight analyzer: use analyze_image and optionally a saved classifier
+        findings = analyzer.analyze_image(data)
+        if clf is not None and 'error' not in findings:
             try:
-                clf = joblib.load(model_path)
-                feats = extract_features_for_ml(filepath)
-                X = [[feats['mean_intensity'], feats['std_intensity'], feats['contrast'], feats['width'], feats['height']]]
-                pred = clf.predict(X)[0]
-                proba = clf.predict_proba(X).max() if hasattr(clf, 'predict_proba') else None
+                # Reuse the statistics analyze_image computed instead of decoding again
+                X = features_from_findings([findings])
+                with timed("classifier"):
+                    pred = clf.predict(X)[0]
+                    proba = clf.predict_proba(X).max() if hasattr(clf, 'predict_proba') else None
                 model_info = {"prediction": str(pred), "confidence": float(proba) if proba is not None else None}
             except Exception as e:
-                logging.exception('Error loading or running ML model')
+                logging.exception('Error running ML model')
                 model_info = {"error": str(e)}
 
-        # Simple HTML representation for findings
-        html_result = "<div style='font-family: Arial, sans-serif;'>"
-        if 'error' in findings:
-            html_result += f"<p style='color:red;'>Error: {findings['error']}</p>"
-        else:
-            html_result += f"<h3>Image Quality Analysis</h3><p><strong>Type:</strong> {findings.get('image_type')}<br/>"
-            html_result += f"<strong>Dimensions:</strong> {findings.get('dimensions')}<br/>"
-            html_result += f"<strong>Mean intensity:</strong> {findings.get('mean_intensity')}<br/>"
-            html_result += f"<strong>Contrast:</strong> {findings.get('contrast_ratio')}<br/>"
-            html_result += f"<strong>Quality:</strong> {findings.get('quality_assessment')}<br/></p>"
-            html_result += "<h4>Recommendations</h4><ul>"
-            for r in findings.get('recommendations', []):
-                html_result += f"<li>{r}</li>"
-            html_result += "</ul>"
-
-        if model_info is not None:
-            html_result += "<h4>Trained Model Prediction</h4>"
-            if 'error' in model_info:
-                html_result += f"<p style='color:red;'>Model error: {model_info['error']}</p>"
-            else:
-                html_result += f"<p><strong>Prediction:</strong> {model_info.get('prediction')}"
-                if model_info.get('confidence') is not None:
-                    html_result += f" &nbsp; (<em>confidence: {model_info['confidence']:.2f}</em>)"
-                html_result += "</p>"
-
-        html_result += "</div>"
-
-        return jsonify({"result": html_result, "analysis": findings, "model_info": model_info}), 200
-    
-    except Exception as e:
-        logging.exception("Error during ML analysis")
-        return jsonify({"error": f"Error during analysis: {str(e)}"}), 500
+        structured = {"analysis": findings, "model_info": model_info}
+        if 'error' not in findings and (model_info is None or 'error' not in model_info):
+            result_cache.set(cache_key, structured)
+
+    payload = dict(structured)
+    if html:
+        with timed("format_html"):
+            payload["result"] = format_lite_analysis(structured["analysis"], structured["model_info"])
+    return payload
+
+
+def format_lite_analysis(findings, model_info):
+    """Format lite analyzer findings and the classifier prediction as HTML"""
+    return LITE_ANALYSIS_TEMPLATE.render(findings=findings, model_info=model_info)
+
+
+def confidence_color(confidence):
+    """Accent color for an ensemble confidence score"""
+    if confidence >= 85:
+        return "#d32f2f"
+    if confidence >= 70:
+        return "#f57c00"
+    if confidence >= 50:
+        return "#fbc02d"
+    return "#388e3c"
 
 
 def format_ml_analysis(analysis_result):
     """Format ML analysis results as HTML using trained medical models"""
     try:
         if "error" in analysis_result:
-            return f"<p style='color: red;'><strong>Error:</strong> {analysis_result['error']}</p>"
-        
-        html = "<div style='font-family: Arial, sans-serif; background: #f5f5f5; padding: 15px; border-radius: 8px;'>"
-        
-        # Trained Datasets Info
-        if "trained_datasets" in analysis_result:
-            html += "<div style='background: #e3f2fd; padding: 10px; border-radius: 5px; margin-bottom: 15px;'>"
-            html += "<p style='margin: 0; font-size: 12px; color: #1976d2;'><strong>📚 Trained on Medical Datasets:</strong></p>"
-            for dataset in analysis_result["trained_datasets"]:
-                html += f"<p style='margin: 5px 0; font-size: 11px; color: #1565c0;'>• {dataset}</p>"
-            html += "</div>"
-        
-        # Ensemble Results
-        if "ensemble_confidence" in analysis_result:
-            confidence = analysis_result['ensemble_confidence']
-            color = "#d32f2f" if confidence >= 85 else "#f57c00" if confidence >= 70 else "#fbc02d" if confidence >= 50 else "#388e3c"
-            html += f"""
-            <div style='background: {color}20; border-left: 4px solid {color}; padding: 12px; margin-bottom: 15px; border-radius: 4px;'>
-            <h3 style='margin-top: 0; color: {color};'>🤖 Ensemble Analysis (Trained Medical Models)</h3>
-            <p style='margin: 8px 0;'><strong>Combined Confidence Score:</strong> <span style='font-size: 18px; color: {color};'>{confidence:.1f}%</span></p>
-            <p style='margin: 8px 0;'><strong>Clinical Recommendation:</strong> {analysis_result['recommendation']}</p>
-            </div>
-            """
-        
-        # DenseNet Results (CheXpert-trained)
-        if "densenet_result" in analysis_result and "error" not in analysis_result["densenet_result"]:
-            dn = analysis_result["densenet_result"]
-            html += f"""
-            <div style='background: white; padding: 12px; margin-bottom: 12px; border-radius: 5px; border: 1px solid #ddd;'>
-            <h4 style='margin-top: 0; color: #1976d2;'>🔬 DenseNet121 Analysis (CheXpert-trained)</h4>
-            <p style='margin: 5px 0;'><strong>Dataset:</strong> {dn.get('dataset', 'CheXpert')}</p>
-            <p style='margin: 5px 0;'><strong>Top Finding:</strong> <span style='color: #d32f2f; font-weight: bold;'>{dn['top_prediction']}</span></p>
-            <p style='margin: 5px 0;'><strong>Confidence:</strong> {dn['confidence']:.1f}%</p>
-            <p style='margin: 5px 0;'><strong>Top Detections:</strong></p>
-            <ul style='margin: 5px 0; padding-left: 20px;'>
-            """
-            for pred in dn["predictions"][:3]:
-                html += f"<li>{pred['class']}: {pred['confidence']:.1f}%</li>"
-            html += "</ul></div>"
-        
-        # MobileNetV2 Results (MIMIC-CXR-trained)
-        if "mobilenet_result" in analysis_result and "error" not in analysis_result["mobilenet_result"]:
-            mn = analysis_result["mobilenet_result"]
-            html += f"""
-            <div style='background: white; padding: 12px; margin-bottom: 12px; border-radius: 5px; border: 1px solid #ddd;'>
-            <h4 style='margin-top: 0; color: #388e3c;'>🔬 MobileNetV2 Analysis (MIMIC-CXR-trained)</h4>
-            <p style='margin: 5px 0;'><strong>Dataset:</strong> {mn.get('dataset', 'MIMIC-CXR')}</p>
-            <p style='margin: 5px 0;'><strong>Top Finding:</strong> <span style='color: #388e3c; font-weight: bold;'>{mn['top_prediction']}</span></p>
-            <p style='margin: 5px 0;'><strong>Confidence:</strong> {mn['confidence']:.1f}%</p>
-            <p style='margin: 5px 0;'><strong>Top Detections:</strong></p>
-            <ul style='margin: 5px 0; padding-left: 20px;'>
-            """
-            for pred in mn["predictions"][:3]:
-                html += f"<li>{pred['class']}: {pred['confidence']:.1f}%</li>"
-            html += "</ul></div>"
-        
-        # Legacy ResNet support
-        if "resnet_result" in analysis_result and "error" not in analysis_result["resnet_result"]:
-            rn = analysis_result["resnet_result"]
-            html += f"""
-            <div style='background: white; padding: 12px; margin-bottom: 12px; border-radius: 5px; border: 1px solid #ddd;'>
-            <h4 style='margin-top: 0;'>📊 ResNet50 Analysis</h4>
-            <p style='margin: 5px 0;'><strong>Top Prediction:</strong> {rn['top_prediction']}</p>
-            <p style='margin: 5px 0;'><strong>Confidence:</strong> {rn['confidence']:.1f}%</p>
-            <ul style='margin: 5px 0; padding-left: 20px;'>
-            """
-            for pred in rn["predictions"][:3]:
-                html += f"<li>{pred['class']}: {pred['confidence']:.1f}%</li>"
-            html += "</ul></div>"
-        
-        html += "</div>"
-        return html
+            return ML_ERROR_TEMPLATE.render(error=analysis_result["error"])
+        color = confidence_color(analysis_result.get("ensemble_confidence", 0))
+        return ML_ANALYSIS_TEMPLATE.render(analysis=analysis_result, color=color)
     except Exception as e:
-        return f"<p style='color: red;'>Error formatting results: {str(e)}</p>"
+        return ML_ERROR_TEMPLATE.render(error=f"Error formatting results: {str(e)}", plain=True)
+
+
+def read_batch_uploads():
+    """Read every multipart file of a batch request (fields "images" and "image")"""
+    files = request.files.getlist("images") + request.files.getlist("image")
+    return [(file.filename, read_upload(file)) for file in files]
+
+
+def iter_batch_uploads(uploads):
+    """
+    Yield (filename, data or None, error) for every image in a batch request
+
+    .zip uploads are expanded and each member is decompressed only when it
+    is reached, so a large archive is never held uncompressed in memory.
+    """
+    count = 0
+    for filename, data in uploads:
+        if filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(data))
+            except zipfile.BadZipFile as e:
+                yield filename, None, f"Invalid zip archive: {e}"
+                continue
+            with archive:
+                for member in archive.infolist():
+                    if member.is_dir() or os.path.basename(member.filename).startswith("."):
+                        continue
+                    count += 1
+                    if count > BATCH_MAX_FILES:
+                        yield member.filename, None, f"Batch limit of {BATCH_MAX_FILES} images exceeded"
+                        return
+                    if not allowed_file(member.filename):
+                        yield member.filename, None, "Allowed image types are png, jpg, jpeg, dicom, dcm"
+                    elif member.file_size > BATCH_MAX_MEMBER_BYTES:
+                        yield member.filename, None, "Archive member is too large"
+                    else:
+                        yield member.filename, archive.read(member), None
+            continue
+
+        count += 1
+        if count > BATCH_MAX_FILES:
+            yield filename, None, f"Batch limit of {BATCH_MAX_FILES} images exceeded"
+            return
+        if not allowed_file(filename):
+            yield filename, None, "Allowed image types are png, jpg, jpeg, dicom, dcm"
+        else:
+            yield filename, data, None
+
+
+def iter_batch_results(uploads, html=True):
+    """
+    Analyze uploads in model-sized batches, yielding one result dict per image
+
+    Cached results are emitted as soon as they are found; the rest are
+    grouped into batches of BATCH_ANALYSIS_SIZE for ensemble_analysis_batch.
+    Multi-frame DICOM files give one result per frame (with "frame" and
+    "frames"), analyzed in batches as the frames are read. The lite
+    analyzer has no batched path and is run image by image, first frame only.
+    """
+    analyzer = get_analyzer()
+    batched = hasattr(analyzer, "ensemble_analysis_batch")
+    pending = []
+
+    def flush():
+        datas = [data for _, _, data, _ in pending]
+        for (index, filename, _, cache_key), (_, analysis) in zip(
+            pending, analyzer.ensemble_analysis_batch(datas, BATCH_ANALYSIS_SIZE)
+        ):
+            cache_ensemble(cache_key, analysis)
+            yield {"index": index, "filename": filename, **ensemble_payload(analysis, html)}
+        pending.clear()
+
+    for index, (filename, data, error) in enumerate(uploads):
+        if error is not None:
+            yield {"index": index, "filename": filename, "error": error}
+            continue
+        persist_upload(filename, data)
+        if not batched:
+            try:
+                yield {"index": index, "filename": filename, **run_ml_analysis(data, html=html), **multiframe_note(data)}
+            except Exception as e:
+                logging.exception("Error during batch ML analysis")
+                yield {"index": index, "filename": filename, "error": f"Error during analysis: {str(e)}"}
+            continue
+
+        frames = dicom_frame_count(data)
+        if frames is not None and frames > 1:
+            try:
+                dicom = read_dicom(data)
+                for frame, analysis in analyzer.ensemble_analysis_frames(dicom, BATCH_ANALYSIS_SIZE):
+                    yield {"index": index, "filename": filename, "frame": frame, "frames": frames,
+                           **ensemble_payload(analysis, html)}
+            except Exception as e:
+                logging.exception("Error during multi-frame analysis")
+                yield {"index": index, "filename": filename, "error": f"Error during analysis: {str(e)}"}
+            continue
+
+        cache_key = ensemble_cache_key(data, analyzer)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            yield {"index": index, "filename": filename, **ensemble_payload(cached, html)}
+            continue
+        pending.append((index, filename, data, cache_key))
+        if len(pending) >= BATCH_ANALYSIS_SIZE:
+            yield from flush()
+
+    if pending:
+        yield from flush()
+
+
+def batch_line_failed(line):
+    """True if a batch result line is an error or an analysis that did not complete"""
+    if "error" in line:
+        return True
+    analysis = line.get("analysis")
+    if not isinstance(analysis, dict):
+        return False
+    if "model_info" in line:
+        # Lite: the image could not be read, or the classifier failed
+        return "error" in analysis or "error" in (line["model_info"] or {})
+    return "ensemble_confidence" not in analysis
+
+
+@app.route("/api/ml-analyze/batch", methods=["POST"])
+def ml_analyze_batch():
+    """
+    Analyze many images in one request, streaming one JSON line per image
+
+    Each line has "index" and "filename" plus either the /api/ml-analyze
+    payload or "error". A multi-frame DICOM file gives one line per frame,
+    with "frame" and "frames". A final {"done": true, ...} line marks a complete
+    stream.
+    """
+    uploads = read_batch_uploads()
+    if not uploads:
+        return jsonify({"error": "No image files provided"}), 400
+    html = not wants_structured()
+
+    def generate():
+        total = errors = 0
+        try:
+            for line in iter_batch_results(iter_batch_uploads(uploads), html):
+                total += 1
+                errors += batch_line_failed(line)
+                yield json.dumps(line) + "\n"
+        except Exception as e:
+            logging.exception("Error during batch ML analysis")
+            yield json.dumps({"error": f"Error during analysis: {str(e)}"}) + "\n"
+            return
+        yield json.dumps({"done": True, "count": total, "errors": errors}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+# Analyses that POST /api/jobs can run; "mode" form field picks one
+JOB_KINDS = {
+    "analyze": lambda data, html: dict(run_analysis(data, html=html), **multiframe_note(data)),
+    "ml": lambda data, html: dict(run_ml_analysis(data, html=html), **multiframe_note(data)),
+}
+
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """
+    Queue an analysis and return its id right away
+
+    Form fields: "image" (required) and "mode" ("analyze", the default,
+    behaves like /api/analyze; "ml" like /api/ml-analyze). Structured
+    negotiation applies at submission. Poll GET /api/jobs/<id> for the
+    result.
+    """
+    file, error_response = validate_upload()
+    if error_response is not None:
+        return error_response
+
+    kind = request.form.get("mode", "analyze")
+    if kind not in JOB_KINDS:
+        return jsonify({"error": f"Unknown mode {kind!r}; expected one of {', '.join(JOB_KINDS)}"}), 400
+
+    data = read_upload(file)
+    persist_upload(file.filename, data)
+    try:
+        job_id = job_queue.submit(kind, JOB_KINDS[kind], data, not wants_structured())
+    except QueueFull:
+        response = jsonify({"error": "Too many pending jobs, try again later"})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+
+    status_url = f"/api/jobs/{job_id}"
+    response = jsonify({"id": job_id, "status": "queued", "status_url": status_url})
+    response.headers["Location"] = status_url
+    return response, 202
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Status of a job, with "result" (the usual analysis payload) once done"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    body = {key: job[key] for key in ("id", "status", "created_at", "started_at", "finished_at")}
+    body["mode"] = job["kind"]
+    if job["result"] is not None:
+        body["result"] = job["result"]
+    if job["error"] is not None:
+        body["error"] = job["error"]
+    return jsonify(body), 200
+
+
+def send_asset(asset):
+    return static_manifest.response(asset, request.accept_encodings, request.if_none_match)
 
 
 @app.route("/")
 def serve_react():
-    index_path = os.path.join(REACT_BUILD_DIR, "index.html")
-    if os.path.exists(index_path):
-        return send_from_directory(REACT_BUILD_DIR, "index.html")
+    asset = static_manifest.get("index.html")
+    if asset is not None:
+        return send_asset(asset)
     return "React app not built. Run 'npm run build' in the frontend directory.", 404
 
 
 @app.route('/<path:path>')
 def serve_static(path):
-    if path != "" and os.path.exists(os.path.join(REACT_BUILD_DIR, path)):
-        return send_from_directory(REACT_BUILD_DIR, path)
-    return send_from_directory(REACT_BUILD_DIR, "index.html")
+    asset = static_manifest.get(path)
+    if asset is not None:
+        return send_asset(asset)
+    # Only extensionless paths are client-side routes; a missing file (a
+    # stale chunk, a typo) is a 404 rather than index.html served as JS
+    if path.startswith("static/") or "." in path.rsplit("/", 1)[-1]:
+        return jsonify({"error": "Not found"}), 404
+    return serve_react()
 
 
 @app.route('/favicon.ico')
 def favicon():
     return Response(status=204)
 
+if ML_WARMUP in ("1", "true", "yes"):
+    start_warmup()
+elif ML_WARMUP == "post_fork":
+    # Preloading under gunicorn: import (but do not build) the backend in
+    # the master so workers share the loaded modules copy-on-write
+    ml_backend.load_backend()
+else:
+    # Lazy loading: the first analysis builds the models and /health
+    # reports ready from then on
+    ml_backend.ready_when_built()
+
 if __name__ == "__main__":
     app.run(debug=True)
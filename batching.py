@@ -0,0 +1,92 @@
+"""
+Dynamic micro-batching for model inference
+Collects concurrent single-image requests into one forward pass per model
+"""
+
+import threading
+import queue
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Groups concurrent predict calls into batches
+
+    Requests are queued and a background thread waits up to ``max_wait_ms``
+    (or until ``max_batch_size`` images are queued) before running a single
+    forward pass. Each caller gets back only the rows it submitted.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=8, max_wait_ms=5, name="model"):
+        """
+        Args:
+            predict_fn: Callable taking an (N, ...) array and returning (N, C) scores
+            max_batch_size: Maximum number of images per forward pass
+            max_wait_ms: How long to wait for more requests after the first one
+            name: Label used for the worker thread
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._run, name=f"batcher-{name}", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, batch):
+        """
+        Queue a batch (usually of one image) for inference
+
+        Returns:
+            Future resolving to the prediction rows for this batch
+        """
+        future = Future()
+        self._queue.put((np.asarray(batch), future))
+        return future
+
+    def predict(self, batch):
+        """Blocking equivalent of submit(batch).result()"""
+        return self.submit(batch).result()
+
+    def _collect(self):
+        """Wait for the first request, then gather more until full or timed out"""
+        items = [self._queue.get()]
+        size = len(items[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            # Skip requests whose callers have already given up
+            items = [item for item in items if item[1].set_running_or_notify_cancel()]
+            if not items:
+                continue
+            try:
+                outputs = np.asarray(
+                    self.predict_fn(np.concatenate([batch for batch, _ in items]))
+                )
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            # Route each slice of the batched output back to its request
+            offset = 0
+            for batch, future in items:
+                future.set_result(outputs[offset:offset + len(batch)])
+                offset += len(batch)
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the MediScan inference stack.
+
+Run individual benchmarks as modules from the repository root, e.g.:
+    python -m benchmarks.compiled_inference
+    python -m benchmarks.suite --output bench.json
+"""
@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: Keras Model.predict vs the compiled fixed-signature path.
+
+By default the models are built with random weights (same architecture and
+cost as the trained ones, no weight download needed). Use --analyzer to
+benchmark the models loaded by ml_model.get_analyzer() instead.
+
+Usage:
+    python -m benchmarks.compiled_inference --iterations 30 --batch-sizes 1 4 8
+"""
+import argparse
+import json
+
+import numpy as np
+
+from benchmarks.timing import measure, summarize
+
+
+def time_calls(fn, batch, iterations, warmup=3):
+    return summarize(measure(lambda: fn(batch), iterations, warmup), items_per_call=len(batch))
+
+
+def load_models(use_analyzer):
+    import tensorflow as tf
+
+    if use_analyzer:
+        from ml_model import get_analyzer
+        analyzer = get_analyzer()
+        return {"densenet": analyzer.densenet_model, "mobilenet": analyzer.mobilenet_model}
+    return {
+        "densenet": tf.keras.applications.DenseNet121(weights=None, input_shape=(224, 224, 3)),
+        "mobilenet": tf.keras.applications.MobileNetV2(weights=None, input_shape=(224, 224, 3)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--analyzer', action='store_true', help='Use the models from ml_model.get_analyzer()')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    from ml_model import CompiledPredictor
+
+    results = []
+    for name, model in load_models(args.analyzer).items():
+        if model is None:
+            print(f"{name}: model not loaded, skipping")
+            continue
+        compiled = CompiledPredictor(model)
+        for batch_size in args.batch_sizes:
+            batch = np.random.uniform(-1, 1, size=(batch_size, 224, 224, 3)).astype('float32')
+            predict = time_calls(lambda b: model.predict(b, verbose=0), batch, args.iterations)
+            fast = time_calls(compiled, batch, args.iterations)
+            row = {
+                "model": name,
+                "batch_size": batch_size,
+                "predict": predict,
+                "compiled": fast,
+                "speedup": predict["mean_ms"] / fast["mean_ms"],
+            }
+            results.append(row)
+            print(f"{name:10s} batch={batch_size:<3d} predict {predict['mean_ms']:8.2f} ms  "
+                  f"compiled {fast['mean_ms']:8.2f} ms  speedup x{row['speedup']:.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
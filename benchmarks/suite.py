@@ -0,0 +1,340 @@
+"""
+Benchmark suite for every inference stage.
+
+Inputs are generated deterministically with generate_demo_dataset.make_image
+at several sizes and encoded as PNG, JPEG and DICOM, plus the images in
+uploads_demo/. Each stage is timed per input and reported as p50/p95/p99
+latency and throughput.
+
+Stages:
+    lite            ml_model_lite analyze_image
+    lite_features   ml_model_lite extract_features_batch (one image)
+    format          app.format_ml_analysis on a fixed ensemble result
+    flask           POST /api/ml-analyze through the Flask test client
+                    (result cache disabled; uses the --full or lite backend)
+    preprocess      ml_model preprocess_image                  (--full)
+    densenet        ml_model analyze_with_densenet             (--full)
+    mobilenet       ml_model analyze_with_resnet               (--full)
+    ensemble        ml_model ensemble_analysis                 (--full)
+
+Usage:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --full --random-weights --sizes 224 1024 --output bench.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.15
+    python -m benchmarks.suite --current bench.json --compare baseline.json
+
+With --compare the run exits with status 1 if any stage/input measured in
+the baseline got slower by more than --threshold (on --metric, p50 by
+default), now fails with an error, or is missing from the current run.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.timing import measure, summarize
+
+LITE_STAGES = ("lite", "lite_features", "format", "flask")
+FULL_STAGES = ("preprocess", "densenet", "mobilenet", "ensemble")
+
+DEFAULT_SIZES = (224, 512, 1024, 2048)
+DEFAULT_FORMATS = ("png", "jpeg", "dicom")
+
+# Representative ensemble_analysis output for the format stage
+SAMPLE_ENSEMBLE = {
+    "ensemble_confidence": 64.2,
+    "densenet_result": {
+        "model": "DenseNet121 (CheXpert-trained)",
+        "predictions": [
+            {"class": name, "confidence": conf, "score": conf / 100}
+            for name, conf in [("Cardiomegaly", 71.3), ("Edema", 55.0), ("Consolidation", 42.8),
+                               ("Pneumonia", 38.1), ("Atelectasis", 31.9)]
+        ],
+        "top_prediction": "Cardiomegaly",
+        "confidence": 71.3,
+        "dataset": "CheXpert (224,316 chest X-rays)",
+    },
+    "mobilenet_result": {
+        "model": "MobileNetV2 (MIMIC-CXR-trained)",
+        "predictions": [
+            {"class": name, "confidence": conf, "score": conf / 100}
+            for name, conf in [("Normal", 57.1), ("Pneumonia", 21.4), ("Effusion", 9.6),
+                               ("Nodule", 6.2), ("Mass", 3.3)]
+        ],
+        "top_prediction": "Normal",
+        "confidence": 57.1,
+        "dataset": "MIMIC-CXR (377,110 chest X-rays with reports)",
+    },
+    "recommendation": "🟡 Moderate confidence - Additional imaging and clinical correlation needed",
+    "trained_datasets": [
+        "CheXpert (224,316 chest X-rays)",
+        "MIMIC-CXR (377,110 chest X-rays with reports)",
+    ],
+}
+
+
+def encode_dicom(arr):
+    """Wrap an 8-bit grayscale array as an uncompressed 16-bit DICOM file"""
+    import pydicom
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian
+
+    meta = FileMetaDataset()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.1"  # Computed Radiography
+    meta.MediaStorageSOPInstanceUID = "1.2.3.4"
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.Rows, ds.Columns = arr.shape
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.BitsAllocated = ds.BitsStored = 16
+    ds.HighBit = 15
+    ds.PixelRepresentation = 0
+    ds.RescaleSlope = 1
+    ds.RescaleIntercept = 0
+    ds.WindowCenter, ds.WindowWidth = 2048, 4096
+    ds.PixelData = (arr.astype(np.uint16) * 16).tobytes()
+
+    buffer = io.BytesIO()
+    if int(pydicom.__version__.split(".")[0]) >= 3:
+        pydicom.dcmwrite(buffer, ds, enforce_file_format=True)
+    else:
+        ds.is_little_endian = True
+        ds.is_implicit_VR = False
+        pydicom.dcmwrite(buffer, ds, write_like_original=False)
+    return buffer.getvalue()
+
+
+def generate_inputs(sizes, formats, seed, uploads_demo, demo_count):
+    """
+    Build the benchmark inputs in memory
+
+    Returns:
+        dict: input name (e.g. "png_1024") -> (filename, bytes)
+    """
+    import tempfile
+
+    from PIL import Image
+
+    from generate_demo_dataset import make_image
+
+    inputs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            # make_image draws from the global NumPy generator
+            np.random.seed(seed + size)
+            path = os.path.join(tmp, f"bench_{size}.png")
+            make_image(path, size=(size, size), mean=128, noise=20)
+            with open(path, "rb") as f:
+                png = f.read()
+            img = Image.open(io.BytesIO(png))
+            for fmt in formats:
+                if fmt == "png":
+                    data, ext = png, "png"
+                elif fmt == "jpeg":
+                    buffer = io.BytesIO()
+                    img.save(buffer, format="JPEG", quality=90)
+                    data, ext = buffer.getvalue(), "jpg"
+                elif fmt == "dicom":
+                    try:
+                        data, ext = encode_dicom(np.asarray(img)), "dcm"
+                    except ImportError:
+                        print("pydicom not installed, skipping DICOM inputs")
+                        continue
+                else:
+                    raise ValueError(f"Unknown format {fmt!r}")
+                inputs[f"{fmt}_{size}"] = (f"bench_{size}.{ext}", data)
+
+    if uploads_demo and demo_count > 0:
+        demo_files = sorted(p for p in Path(uploads_demo).glob("*.png"))[:demo_count]
+        for path in demo_files:
+            inputs[f"demo_{path.stem}"] = (path.name, path.read_bytes())
+    return inputs
+
+
+def build_stages(names, full, random_weights):
+    """
+    Map stage name -> (fn(filename, data), per_input) for the requested stages
+
+    per_input is False for stages whose cost does not depend on the image.
+    """
+    stages = {}
+    if "lite" in names or "lite_features" in names:
+        import ml_model_lite
+
+        lite = ml_model_lite.get_analyzer()
+        stages["lite"] = (lambda name, data: lite.analyze_image(data), True)
+        stages["lite_features"] = (lambda name, data: ml_model_lite.extract_features_batch([data]), True)
+
+    if "format" in names or "flask" in names:
+        import app as app_module
+        from result_cache import ResultCache
+
+        # Measure the analysis, not the cache
+        app_module.result_cache = ResultCache(max_entries=0)
+        client = app_module.app.test_client()
+        stages["format"] = (lambda name, data: app_module.format_ml_analysis(SAMPLE_ENSEMBLE), False)
+
+        def flask_request(name, data):
+            response = client.post("/api/ml-analyze", data={"image": (io.BytesIO(data), name)})
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/ml-analyze returned {response.status_code}")
+
+        stages["flask"] = (flask_request, True)
+
+    if full and any(name in FULL_STAGES for name in names):
+        import ml_model
+
+        if random_weights:
+            # Same architectures and cost as the trained models, no download
+            for cls_name in ("DenseNet121", "MobileNetV2"):
+                cls = getattr(ml_model, cls_name)
+                setattr(ml_model, cls_name, lambda *a, _cls=cls, **k: _cls(*a, **{**k, "weights": None}))
+        analyzer = ml_model.get_analyzer()
+        stages["preprocess"] = (lambda name, data: analyzer.preprocess_image(data), True)
+        stages["densenet"] = (lambda name, data: analyzer.analyze_with_densenet(data), True)
+        stages["mobilenet"] = (lambda name, data: analyzer.analyze_with_resnet(data), True)
+        stages["ensemble"] = (lambda name, data: analyzer.ensemble_analysis(data), True)
+
+    return {name: stages[name] for name in names if name in stages}
+
+
+def environment():
+    """Details that make two result files comparable (or not)"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "ml_backend": os.environ.get("ML_BACKEND"),
+    }
+
+
+def run(args):
+    stage_names = args.stages or (LITE_STAGES + (FULL_STAGES if args.full else ()))
+    stages = build_stages(stage_names, args.full, args.random_weights)
+    inputs = generate_inputs(args.sizes, args.formats, args.seed, args.uploads_demo, args.demo_count)
+
+    results = {}
+    for stage_name, (fn, per_input) in stages.items():
+        cases = inputs.items() if per_input else [("fixed", ("", b""))]
+        for input_name, (filename, data) in cases:
+            key = f"{stage_name}/{input_name}"
+            try:
+                timings = measure(lambda: fn(filename, data), args.iterations, args.warmup)
+            except Exception as e:
+                print(f"{key:36s} failed: {e}")
+                results[key] = {"error": str(e)}
+                continue
+            stats = summarize(timings)
+            results[key] = stats
+            print(f"{key:36s} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                  f"p99 {stats['p99_ms']:9.3f} ms  {stats['throughput_per_s']:9.1f}/s")
+
+    return {
+        "environment": environment(),
+        "config": {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "sizes": list(args.sizes),
+            "formats": list(args.formats),
+            "full": args.full,
+            "random_weights": args.random_weights,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold, metric="p50_ms"):
+    """
+    Compare two result files
+
+    Returns:
+        list of (key, baseline value, current value, ratio) for every
+        stage/input that got slower by more than threshold, plus (key,
+        baseline value, None, None) for ones that errored or are missing
+    """
+    regressions = []
+    for key, base in sorted(baseline["results"].items()):
+        if metric not in base:
+            continue
+        now = current["results"].get(key)
+        if now is None or metric not in now:
+            problem = "MISSING" if now is None else f"ERROR: {now.get('error', 'no ' + metric)}"
+            print(f"{key:36s} {base[metric]:9.3f} -> {problem}")
+            regressions.append((key, base[metric], None, None))
+            continue
+        ratio = now[metric] / base[metric] if base[metric] > 0 else 1.0
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{key:36s} {base[metric]:9.3f} -> {now[metric]:9.3f} ms  x{ratio:5.2f}  {flag}")
+        if flag:
+            regressions.append((key, base[metric], now[metric], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every inference stage")
+    parser.add_argument("--stages", nargs="+", choices=LITE_STAGES + FULL_STAGES,
+                        help="Stages to run (default: the lite stages, plus the TensorFlow ones with --full)")
+    parser.add_argument("--full", action="store_true", help="Include the TensorFlow stages (ML_BACKEND=full)")
+    parser.add_argument("--random-weights", action="store_true",
+                        help="Build the CNNs without downloading ImageNet weights when no trained .h5 exists")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--formats", nargs="+", default=list(DEFAULT_FORMATS), choices=DEFAULT_FORMATS)
+    parser.add_argument("--uploads-demo", default="uploads_demo", help="Directory of extra real inputs ('' to skip)")
+    parser.add_argument("--demo-count", type=int, default=3, help="How many uploads_demo images to include")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--current", help="Compare this existing result file instead of running")
+    parser.add_argument("--compare", help="Baseline result file; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown ratio (0.15 = 15%%)")
+    parser.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+    args = parser.parse_args(argv)
+
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        # Pick the backend before app/ml_backend are imported, and keep the
+        # app from warming models up in the background while we measure
+        os.environ.setdefault("ML_BACKEND", "full" if args.full else "lite")
+        os.environ.setdefault("ML_WARMUP", "0")
+        current = run(args)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+            print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold, args.metric)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+Timing helpers shared by the benchmarks.
+"""
+import gc
+import time
+
+import numpy as np
+
+
+def measure(fn, iterations, warmup=3):
+    """Call fn() warmup + iterations times; return the timed calls in ms"""
+    for _ in range(warmup):
+        fn()
+    gc.collect()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings, items_per_call=1):
+    """Latency percentiles (ms) and throughput (items/s) for a list of call timings"""
+    timings = np.asarray(timings, dtype=np.float64)
+    total_s = timings.sum() / 1000
+    return {
+        "iterations": int(timings.size),
+        "mean_ms": float(timings.mean()),
+        "min_ms": float(timings.min()),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "throughput_per_s": float(timings.size * items_per_call / total_s) if total_s > 0 else float("inf"),
+    }
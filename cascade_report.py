@@ -0,0 +1,157 @@
+"""
+Measure what cascade mode (ML_CASCADE=1) would save on a dataset and how
+often it agrees with the full ensemble.
+
+Usage:
+    python cascade_report.py --images_dir uploads_demo --band 30:85 --band 50:85
+    ML_CASCADE=1 ML_CASCADE_LOW=30 ML_CASCADE_HIGH=85 python app.py
+
+Every image is run through both models once and the per-model forward
+times are measured; each uncertainty band is then replayed from those
+results. Compute saved is the measured per-request cost with
+DenseNet121 (and the classifier, with --classifier) run only for escalated
+images. Agreement compares the cascade's recommendation and combined
+confidence with the full ensemble's. The report is written as JSON
+(default cascade_report.json).
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+# Time forward passes directly, without micro-batching waits
+os.environ.setdefault('ML_BATCHING', '0')
+
+from ml_model import CASCADE_HIGH, CASCADE_LOW, MedicalImagingAnalyzer
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.dcm'}
+
+
+def list_images(images_dir, limit=None):
+    paths = sorted(
+        os.path.join(directory, name)
+        for directory, _, names in os.walk(images_dir)
+        for name in names
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+    return paths[:limit] if limit else paths
+
+
+def parse_band(value):
+    low, high = (float(part) for part in value.split(':'))
+    if low > high:
+        raise argparse.ArgumentTypeError(f'Band {value!r}: low must not exceed high')
+    return low, high
+
+
+def timed_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run_models(analyzer, paths, classifier):
+    """Both models (and optionally the classifier) on every image, with timings in ms"""
+    rows = []
+    for path in paths:
+        img, decode_ms = timed_call(analyzer.load_image, path)
+        if img is None:
+            print(f'Warning: could not decode {path}, skipping')
+            continue
+        mobilenet, mobilenet_ms = timed_call(analyzer.analyze_with_resnet, path, img)
+        densenet, densenet_ms = timed_call(analyzer.analyze_with_densenet, path, img)
+        row = {
+            "path": path,
+            "mobilenet": mobilenet,
+            "densenet": densenet,
+            "ms": {"decode": decode_ms, "mobilenet": mobilenet_ms, "densenet": densenet_ms},
+        }
+        if classifier:
+            row["classifier"], row["ms"]["classifier"] = timed_call(analyzer.analyze_with_classifier, img)
+        rows.append(row)
+    return rows
+
+
+def band_report(analyzer, rows, band, classifier):
+    escalated = 0
+    full_ms = cascade_ms = 0.0
+    same_recommendation = 0
+    confidence_diffs = []
+    for row in rows:
+        ms = row["ms"]
+        full = analyzer._combine_results(row["densenet"], row["mobilenet"])
+        full_ms += ms["decode"] + ms["mobilenet"] + ms["densenet"]
+        cascade_ms += ms["decode"] + ms["mobilenet"]
+
+        if analyzer._needs_escalation(row["mobilenet"], band):
+            escalated += 1
+            cascade_ms += ms["densenet"] + (ms["classifier"] if classifier else 0.0)
+            cascade = analyzer._cascade_result(row["mobilenet"], row["densenet"], row.get("classifier"))
+        else:
+            cascade = analyzer._cascade_result(row["mobilenet"])
+
+        if "ensemble_confidence" in full and "ensemble_confidence" in cascade:
+            same_recommendation += full["recommendation"] == cascade["recommendation"]
+            confidence_diffs.append(abs(full["ensemble_confidence"] - cascade["ensemble_confidence"]))
+
+    n = len(rows)
+    return {
+        "low": band[0],
+        "high": band[1],
+        "images": n,
+        "escalated_fraction": escalated / n,
+        "full_ms_per_request": full_ms / n,
+        "cascade_ms_per_request": cascade_ms / n,
+        "compute_saved_fraction": 1 - cascade_ms / full_ms if full_ms else 0.0,
+        "speedup": full_ms / cascade_ms if cascade_ms else float("inf"),
+        "recommendation_agreement": same_recommendation / len(confidence_diffs) if confidence_diffs else None,
+        "mean_abs_confidence_diff": float(np.mean(confidence_diffs)) if confidence_diffs else None,
+        "max_abs_confidence_diff": float(np.max(confidence_diffs)) if confidence_diffs else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images_dir', required=True, help='Images to replay (searched recursively)')
+    parser.add_argument('--band', type=parse_band, action='append',
+                        help='Uncertainty band LOW:HIGH in percent; repeat to compare several '
+                             '(default: ML_CASCADE_LOW:ML_CASCADE_HIGH)')
+    parser.add_argument('--classifier', action='store_true',
+                        help='Also run the custom medical classifier for escalated images')
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--report', default='cascade_report.json')
+    args = parser.parse_args()
+
+    paths = list_images(args.images_dir, args.limit)
+    if not paths:
+        print(f'No images found in {args.images_dir}. Exiting.')
+        return
+
+    analyzer = MedicalImagingAnalyzer()
+    analyzer.warmup()
+    rows = run_models(analyzer, paths, args.classifier)
+    if not rows:
+        print('No image could be decoded. Exiting.')
+        return
+
+    report = {
+        "model_version": analyzer.model_version,
+        "classifier": args.classifier,
+        "bands": [band_report(analyzer, rows, band, args.classifier) for band in args.band or [(CASCADE_LOW, CASCADE_HIGH)]],
+    }
+    for band in report["bands"]:
+        agreement = band["recommendation_agreement"]
+        print(f'[{band["low"]:g}, {band["high"]:g}): {band["escalated_fraction"]:.1%} escalated, '
+              f'{band["full_ms_per_request"]:.1f} ms -> {band["cascade_ms_per_request"]:.1f} ms per request '
+              f'({band["speedup"]:.2f}x), recommendation agreement '
+              f'{"n/a" if agreement is None else f"{agreement:.1%}"}')
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote cascade report to {args.report}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Response compression for the API
+gzip is always available; brotli is used when the optional brotli package
+is installed and the client prefers it
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/html",
+    "text/plain",
+)
+
+
+def supported_encodings():
+    """Encodings this process can produce, in order of preference"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encodings):
+    """
+    Pick the encoding for a response
+
+    Args:
+        accept_encodings: werkzeug Accept object (request.accept_encodings)
+
+    Returns:
+        "br", "gzip" or None
+    """
+    for encoding in supported_encodings():
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level):
+    """Compress bytes with gzip (level 1-9) or brotli (quality 0-11, same scale)"""
+    if encoding == "br":
+        return brotli.compress(data, quality=min(11, level))
+    return gzip.compress(data, compresslevel=level)
+
+
+def compress_response(response, accept_encodings, min_bytes=1024, level=5):
+    """
+    Compress a buffered response in place when it is worth it
+
+    Streamed, already-encoded, file and non-2xx responses are left alone, as
+    are bodies smaller than min_bytes and types outside COMPRESSIBLE_TYPES.
+    """
+    response.vary.add("Accept-Encoding")
+    if (
+        response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or not 200 <= response.status_code < 300
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+
+    response.set_data(compress(data, encoding, level))
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,247 @@
+"""
+DICOM reader for the analyzers
+Parses the header with pydicom, memory-maps uncompressed pixel data instead
+of copying it, and applies the modality LUT (rescale slope/intercept) and VOI
+windowing in NumPy, one frame at a time
+"""
+
+import io
+import os
+import struct
+
+import numpy as np
+from PIL import Image
+
+DICOM_MAGIC = b"DICM"
+PREAMBLE_SIZE = 128
+
+PIXEL_DATA_TAG = struct.pack("<HH", 0x7FE0, 0x0010)
+
+# Transfer syntaxes whose pixel data is a plain little-endian array
+UNCOMPRESSED_SYNTAXES = {
+    "1.2.840.10008.1.2",  # Implicit VR Little Endian
+    "1.2.840.10008.1.2.1",  # Explicit VR Little Endian
+}
+
+
+def is_dicom(source):
+    """True if source (path, bytes or seekable stream) has the DICM marker"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[PREAMBLE_SIZE:PREAMBLE_SIZE + 4]) == DICOM_MAGIC
+    if hasattr(source, "read"):
+        if not (hasattr(source, "seekable") and source.seekable()):
+            return False
+        position = source.tell()
+        try:
+            source.seek(PREAMBLE_SIZE)
+            return source.read(4) == DICOM_MAGIC
+        finally:
+            source.seek(position)
+    try:
+        with open(source, "rb") as f:
+            f.seek(PREAMBLE_SIZE)
+            return f.read(4) == DICOM_MAGIC
+    except (OSError, TypeError):
+        return False
+
+
+def _first(value, default=None):
+    """First item of a possibly multi-valued DICOM element"""
+    if value is None or value == "":
+        return default
+    try:
+        return float(value[0])
+    except TypeError:
+        return float(value)
+
+
+class DicomImage:
+    """
+    One DICOM file with lazily accessed, windowed frames
+
+    Uncompressed pixel data is a view over the file (np.memmap) or the
+    upload bytes (np.frombuffer), so only the frame being converted is ever
+    materialized. Compressed transfer syntaxes are decoded by pydicom.
+    """
+
+    def __init__(self, source):
+        import pydicom
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._buffer = memoryview(source)
+            self._path = None
+            fp = io.BytesIO(self._buffer)
+        elif hasattr(source, "read"):
+            if hasattr(source, "seekable") and source.seekable():
+                source.seek(0)
+            self._buffer = memoryview(source.read())
+            self._path = None
+            fp = io.BytesIO(self._buffer)
+        else:
+            self._buffer = None
+            self._path = os.fspath(source)
+            fp = open(self._path, "rb")
+
+        try:
+            self.header = pydicom.dcmread(fp, stop_before_pixels=True)
+            self._pixel_offset = fp.tell()
+        finally:
+            if self._path is not None:
+                fp.close()
+
+        header = self.header
+        self.rows = int(header.Rows)
+        self.columns = int(header.Columns)
+        self.samples_per_pixel = int(header.get("SamplesPerPixel", 1))
+        self.frame_count = int(header.get("NumberOfFrames", 1) or 1)
+        self.photometric = str(header.get("PhotometricInterpretation", "MONOCHROME2"))
+        self.slope = _first(header.get("RescaleSlope"), 1.0)
+        self.intercept = _first(header.get("RescaleIntercept"), 0.0)
+        self.window_center = _first(header.get("WindowCenter"))
+        self.window_width = _first(header.get("WindowWidth"))
+        self.transfer_syntax = str(header.file_meta.get("TransferSyntaxUID", "1.2.840.10008.1.2"))
+        self._pixels = None
+
+    @property
+    def pixels(self):
+        """Raw stored values, shape (frames, rows, columns[, samples])"""
+        if self._pixels is None:
+            if self.transfer_syntax in UNCOMPRESSED_SYNTAXES:
+                self._pixels = self._map_pixels()
+            else:
+                self._pixels = self._decode_pixels()
+        return self._pixels
+
+    def _dtype(self):
+        bits = int(self.header.BitsAllocated)
+        if bits not in (8, 16, 32):
+            raise ValueError(f"Unsupported BitsAllocated {bits}")
+        signed = int(self.header.get("PixelRepresentation", 0)) == 1
+        return np.dtype(f"<{'i' if signed else 'u'}{bits // 8}")
+
+    def _map_pixels(self):
+        """View the uncompressed pixel data element without copying it"""
+        explicit_vr = self.transfer_syntax == "1.2.840.10008.1.2.1"
+        # stop_before_pixels leaves the stream at (or just after) the pixel
+        # data tag, depending on the pydicom version; find it from there
+        start = max(0, self._pixel_offset - 8)
+        if self._path is not None:
+            with open(self._path, "rb") as f:
+                f.seek(start)
+                window = f.read(64)
+        else:
+            window = bytes(self._buffer[start:start + 64])
+        index = window.find(PIXEL_DATA_TAG)
+        if index < 0:
+            raise ValueError("Pixel data element not found")
+        offset = start + index + (12 if explicit_vr else 8)
+
+        dtype = self._dtype()
+        shape = (self.frame_count, self.rows, self.columns)
+        if self.samples_per_pixel > 1:
+            if int(self.header.get("PlanarConfiguration", 0)) != 0:
+                return self._decode_pixels()
+            shape += (self.samples_per_pixel,)
+        count = int(np.prod(shape))
+        if self._path is not None:
+            return np.memmap(self._path, dtype=dtype, mode="r", offset=offset, shape=shape)
+        return np.frombuffer(self._buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+    def _decode_pixels(self):
+        """Compressed or unusual layouts: let pydicom decode everything"""
+        import pydicom
+
+        if self._path is not None:
+            dataset = pydicom.dcmread(self._path)
+        else:
+            dataset = pydicom.dcmread(io.BytesIO(self._buffer))
+        pixels = dataset.pixel_array
+        if self.frame_count == 1:
+            pixels = pixels[np.newaxis]
+        return pixels
+
+    def frame(self, index=0):
+        """
+        Windowed frame scaled to 0-255
+
+        Applies rescale slope/intercept, then the VOI window from the header
+        (or the frame's min/max when there is none), and inverts MONOCHROME1.
+
+        Returns:
+            float32 array of shape (rows, columns) or (rows, columns, 3)
+        """
+        values = np.array(self.pixels[index], dtype=np.float32)
+        if self.samples_per_pixel > 1:
+            # Color data is already display-ready
+            return values[..., :3]
+
+        if self.slope != 1.0:
+            values *= np.float32(self.slope)
+        if self.intercept != 0.0:
+            values += np.float32(self.intercept)
+
+        if self.window_center is not None and self.window_width is not None and self.window_width >= 1:
+            # Linear VOI function from PS3.3 C.11.2.1.2
+            low = self.window_center - 0.5 - (self.window_width - 1) / 2
+            scale = 255.0 / max(self.window_width - 1, 1e-6)
+        else:
+            low = float(values.min())
+            scale = 255.0 / max(float(values.max()) - low, 1e-6)
+        values -= np.float32(low)
+        values *= np.float32(scale)
+        np.clip(values, 0.0, 255.0, out=values)
+
+        if self.photometric == "MONOCHROME1":
+            np.subtract(255.0, values, out=values)
+        return values
+
+    def iter_frames(self):
+        """Yield windowed frames one at a time"""
+        for index in range(self.frame_count):
+            yield self.frame(index)
+
+    def to_pil(self, index=0):
+        """Windowed frame as an 8-bit PIL image (L or RGB)"""
+        return Image.fromarray(self.frame(index).astype(np.uint8))
+
+    def to_jpeg(self, index=0, quality=95):
+        """Windowed frame encoded as JPEG bytes, for consumers that need a web format"""
+        buffer = io.BytesIO()
+        self.to_pil(index).save(buffer, format="JPEG", quality=quality)
+        return buffer.getvalue()
+
+    def model_input(self, index=0, size=(224, 224)):
+        """
+        Windowed frame resized for the CNNs
+
+        Resizing happens on the float frame (PIL mode F) so windowing
+        precision is kept until the end.
+
+        Returns:
+            float32 array of shape (size[1], size[0], 3) with 0-255 values
+        """
+        values = self.frame(index)
+        if values.ndim == 3:
+            return np.asarray(
+                Image.fromarray(values.astype(np.uint8)).resize(size), dtype=np.float32
+            )
+        resized = np.asarray(Image.fromarray(values).resize(size, Image.BILINEAR))
+        return np.repeat(resized[..., np.newaxis], 3, axis=2)
+
+    def iter_model_inputs(self, size=(224, 224)):
+        """Yield model_input() for every frame"""
+        for index in range(self.frame_count):
+            yield self.model_input(index, size)
+
+
+def read_dicom(source):
+    """
+    Open a DICOM file from a path, bytes or a binary file-like object
+
+    Raises:
+        RuntimeError: pydicom is not installed
+    """
+    try:
+        return DicomImage(source)
+    except ImportError as e:
+        raise RuntimeError("DICOM support requires pydicom (pip install pydicom)") from e
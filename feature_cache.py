@@ -0,0 +1,232 @@
+"""
+Parallel, cached featurization for the lite classifier
+Features are kept in an .npz file keyed by path, size and mtime (or content
+hash) plus the feature version, so retrains only featurize new or changed images
+"""
+
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ml_model_lite import FEATURE_NAMES, FEATURE_VERSION, extract_features_batch
+
+
+def _content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat_fingerprint(path):
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def file_fingerprint(path, use_hash=False):
+    """Identify a file's current contents: 'size:mtime_ns', or its SHA-256"""
+    if use_hash:
+        return _content_hash(path)
+    return _stat_fingerprint(path)
+
+
+class FeatureCache:
+    """
+    Feature rows keyed by absolute path and fingerprint
+
+    The whole cache is one .npz file with parallel arrays (paths,
+    fingerprints, stats, features). It is discarded if written with a
+    different FEATURE_VERSION. With use_hash the fingerprint is the content
+    SHA-256 and the size/mtime stat is kept alongside it, so files whose
+    stat is unchanged are not read again to be hashed.
+    """
+
+    def __init__(self, path, use_hash=False):
+        self.path = path
+        self.use_hash = use_hash
+        self._rows = {}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if (
+                    str(data["version"]) != FEATURE_VERSION
+                    or bool(data["use_hash"]) != self.use_hash
+                    or "stats" not in data.files
+                ):
+                    return
+                for path, fingerprint, stat, row in zip(
+                    data["paths"], data["fingerprints"], data["stats"], data["features"]
+                ):
+                    self._rows[str(path)] = (str(fingerprint), str(stat), row)
+        except Exception as e:
+            print(f"Warning: ignoring unreadable feature cache {self.path}: {e}")
+
+    def entry(self, path):
+        """(fingerprint, stat, row) cached for path, or None"""
+        return self._rows.get(os.path.abspath(path))
+
+    def lookup(self, path, fingerprint):
+        entry = self.entry(path)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[2]
+        return None
+
+    def update(self, path, fingerprint, row, stat=None):
+        self._rows[os.path.abspath(path)] = (fingerprint, stat or fingerprint, np.asarray(row, dtype=np.float32))
+
+    def save(self):
+        """Write the cache atomically"""
+        if not self.path:
+            return
+        paths = sorted(self._rows)
+        features = np.empty((len(paths), len(FEATURE_NAMES)), dtype=np.float32)
+        fingerprints, stats = [], []
+        for i, path in enumerate(paths):
+            fingerprint, stat, row = self._rows[path]
+            fingerprints.append(fingerprint)
+            stats.append(stat)
+            features[i] = row
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npz.tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                version=np.array(FEATURE_VERSION),
+                use_hash=np.array(self.use_hash),
+                paths=np.array(paths, dtype=str),
+                fingerprints=np.array(fingerprints, dtype=str),
+                stats=np.array(stats, dtype=str),
+                features=features,
+            )
+        os.replace(tmp_path, self.path)
+
+
+def _featurize_chunk(paths):
+    """Worker: featurize a chunk, returning NaN rows for unreadable images"""
+    features = np.full((len(paths), len(FEATURE_NAMES)), np.nan, dtype=np.float32)
+    for i, path in enumerate(paths):
+        try:
+            features[i] = extract_features_batch([path])[0]
+        except Exception as e:
+            print(f"Warning: could not featurize {path}: {e}")
+    return features
+
+
+def _hash_and_featurize_chunk(paths, cached_hashes):
+    """
+    Worker for use_hash: hash each file, featurizing it only if the hash changed
+
+    Each file is read once; the bytes are both hashed and featurized.
+
+    Returns:
+        (hashes, features, changed): hashes are None and rows NaN for
+        unreadable files; rows of unchanged files (changed False) are NaN
+        and should come from the cache
+    """
+    hashes = [None] * len(paths)
+    changed = np.ones(len(paths), dtype=bool)
+    features = np.full((len(paths), len(FEATURE_NAMES)), np.nan, dtype=np.float32)
+    for i, (path, cached_hash) in enumerate(zip(paths, cached_hashes)):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            hashes[i] = hashlib.sha256(data).hexdigest()
+            if hashes[i] == cached_hash:
+                changed[i] = False
+                continue
+            features[i] = extract_features_batch([data])[0]
+        except Exception as e:
+            print(f"Warning: could not featurize {path}: {e}")
+    return hashes, features, changed
+
+
+def featurize(paths, workers=None, cache_path=None, use_hash=False, chunk_size=None):
+    """
+    Featurize images in parallel, reusing cached rows for unchanged files
+
+    Args:
+        paths: Image paths
+        workers: Process count (None = os.cpu_count(), 1 = no pool)
+        cache_path: .npz feature cache to read and update, or None
+        use_hash: Key the cache on content SHA-256 instead of size/mtime;
+            files whose size/mtime changed are hashed in the worker pool
+        chunk_size: Images per worker task (default: spread over ~4 tasks per worker, at most 256)
+
+    Returns:
+        (features, ok): (N, 5) float32 matrix and a boolean mask of the
+        images that could be read
+    """
+    paths = list(paths)
+    cache = FeatureCache(cache_path, use_hash=use_hash)
+    features = np.full((len(paths), len(FEATURE_NAMES)), np.nan, dtype=np.float32)
+    stats = []
+    todo = []
+    for i, path in enumerate(paths):
+        try:
+            stat = _stat_fingerprint(path)
+        except OSError:
+            stat = None
+        stats.append(stat)
+        entry = cache.entry(path)
+        if stat is not None and entry is not None and entry[1] == stat:
+            # Unchanged size/mtime: reuse the row (and, with use_hash, the hash)
+            features[i] = entry[2]
+        else:
+            todo.append(i)
+
+    refeaturized = 0
+    if todo:
+        if chunk_size is None:
+            chunk_size = min(256, max(1, -(-len(todo) // ((workers or os.cpu_count() or 1) * 4))))
+        chunks = [todo[start:start + chunk_size] for start in range(0, len(todo), chunk_size)]
+        chunk_paths = [[paths[i] for i in chunk] for chunk in chunks]
+
+        def run(fn, *args):
+            if workers == 1 or len(chunks) == 1:
+                return map(fn, *args)
+            return pool.map(fn, *args)
+
+        def store_row(i, fingerprint, row):
+            features[i] = row
+            if fingerprint is not None and not np.isnan(row).any():
+                cache.update(paths[i], fingerprint, row, stats[i])
+
+        with ProcessPoolExecutor(max_workers=workers) if workers != 1 and len(chunks) > 1 else _no_pool() as pool:
+            if use_hash:
+                cached_hashes = [[(cache.entry(paths[i]) or (None,))[0] for i in chunk] for chunk in chunks]
+                for chunk, (hashes, rows, changed) in zip(chunks, run(_hash_and_featurize_chunk, chunk_paths, cached_hashes)):
+                    for i, fingerprint, row, is_changed in zip(chunk, hashes, rows, changed):
+                        if not is_changed:
+                            # Touched but identical: keep the row, refresh the stat
+                            row = cache.entry(paths[i])[2]
+                        else:
+                            refeaturized += 1
+                        store_row(i, fingerprint, row)
+            else:
+                for chunk, rows in zip(chunks, run(_featurize_chunk, chunk_paths)):
+                    for i, row in zip(chunk, rows):
+                        refeaturized += 1
+                        store_row(i, stats[i], row)
+        cache.save()
+
+    print(f"Featurized {refeaturized} images, {len(paths) - refeaturized} from cache")
+    ok = ~np.isnan(features).any(axis=1)
+    return features, ok
+
+
+class _no_pool:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
@@ -331,6 +331,61 @@ function App() {
     }
   };
 
+  const escapeHtml = (text) =>
+    text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+
+  // Read Server-Sent Events from /api/analyze/stream. Returns true once the
+  // final result was shown, false if the stream ended without one.
+  const streamAnalysis = async (apiUrl, formData) => {
+    const response = await fetch(`${apiUrl}/api/analyze/stream`, {
+      method: 'POST',
+      body: formData,
+    });
+    if (!response.ok || !response.body) {
+      return false;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) {
+        return false;
+      }
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const event = (block.match(/^event: (.*)$/m) || [])[1];
+        const data = (block.match(/^data: (.*)$/m) || [])[1];
+        if (!event || data === undefined) {
+          continue;
+        }
+        const payload = JSON.parse(data);
+        if (event === 'token') {
+          text += payload.text;
+          setLoading(false);
+          setResult(`<p style="white-space: pre-wrap;">${escapeHtml(text)}</p>`);
+        } else if (event === 'fallback') {
+          text = '';
+          setLoading(true);
+          setResult(null);
+        } else if (event === 'done') {
+          setResult(payload.result);
+          setLoading(false);
+          return true;
+        } else if (event === 'error') {
+          setError(payload.error);
+          setLoading(false);
+          return true;
+        }
+      }
+    }
+  };
+
   const handleAnalyze = async () => {
     if (!selectedFile) {
       setError('Please select an image first');
@@ -344,10 +399,22 @@ function App() {
     setError(null);
     setResult(null);
 
+    const apiUrl = process.env.REACT_APP_API_URL || 'http://localhost:5000';
+    console.log('API URL:', apiUrl);
+
+    try {
+      // Show Groq output as it arrives; fall back to the plain endpoint
+      // if streaming is unavailable
+      if (await streamAnalysis(apiUrl, formData)) {
+        return;
+      }
+    } catch (err) {
+      console.warn('Streaming analysis failed, retrying without streaming:', err);
+    }
+    setLoading(true);
+    setResult(null);
+
     try {
-      const apiUrl = process.env.REACT_APP_API_URL || 'http://localhost:5000';
-      console.log('API URL:', apiUrl);
-      
       const response = await axios.post(`${apiUrl}/api/analyze`, formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
@@ -745,7 +812,7 @@ function App() {
                       <div className="relative">
                         <input
                           type="file"
-                          accept=".png,.jpg,.jpeg,.dicom"
+                          accept=".png,.jpg,.jpeg,.dicom,.dcm"
                           onChange={handleFileChange}
                           disabled={loading}
                           className="hidden"
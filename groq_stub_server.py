@@ -0,0 +1,98 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Useful for exercising the Groq path, the ML fallback and hedging without
+network access or API quota.
+
+Usage:
+    python groq_stub_server.py --port 8085 --delay 5
+    GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:8085 GROQ_HEDGE=1 python app.py
+
+Use --fail to answer every request with HTTP 500. Requests with
+"stream": true get the reply word by word as server-sent events, --delay
+apart.
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(delay, fail, reply):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if request.get('stream') and not fail:
+                self.stream_reply(request)
+                return
+            time.sleep(delay)
+
+            if fail:
+                body = json.dumps({'error': {'message': 'stub failure'}}).encode('utf-8')
+                self.send_response(500)
+            else:
+                body = json.dumps({
+                    'id': 'chatcmpl-stub',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'stub'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': reply},
+                        'finish_reason': 'stop',
+                    }],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                }).encode('utf-8')
+                self.send_response(200)
+
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def stream_reply(self, request):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            words = reply.split(' ')
+            for i, word in enumerate(words):
+                time.sleep(delay / max(len(words), 1))
+                chunk = {
+                    'id': 'chatcmpl-stub',
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'stub'),
+                    'choices': [{
+                        'index': 0,
+                        'delta': {'content': word if i == 0 else ' ' + word},
+                        'finish_reason': None,
+                    }],
+                }
+                self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            print(f'[groq-stub] {self.path} ' + (format % args))
+
+    return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8085)
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds to wait before answering')
+    parser.add_argument('--fail', action='store_true', help='Respond with HTTP 500')
+    parser.add_argument('--reply', default='This is a **stub** analysis of the image.')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.delay, args.fail, args.reply))
+    print(f'Groq stub listening on http://{args.host}:{args.port}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
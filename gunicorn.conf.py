@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for the MediScan backend.
+
+The app is preloaded in the master so every worker shares the imported
+TensorFlow/Keras modules copy-on-write. Models themselves are built and
+warmed up in each worker after fork, because the TensorFlow runtime is
+not fork-safe; /health reports "ready": true once that has finished.
+
+Prometheus metrics run in multiprocess mode: each worker writes to
+PROMETHEUS_MULTIPROC_DIR and /metrics sums them, whichever worker serves
+the scrape. The directory is emptied here, before the app is loaded.
+"""
+import os
+import shutil
+import tempfile
+
+# Tell app.py not to warm up at import time (that would run in the master)
+os.environ.setdefault("ML_WARMUP", "post_fork")
+
+# Must be set before prometheus_client is imported (by app via metrics)
+_metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "mediscan-metrics")
+)
+shutil.rmtree(_metrics_dir, ignore_errors=True)
+os.makedirs(_metrics_dir, exist_ok=True)
+
+preload_app = True
+
+
+def post_fork(server, worker):
+    import app
+
+    if app.ML_WARMUP == "post_fork":
+        app.start_warmup()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,52 @@
+"""
+Image source helpers shared by the analyzers
+Lets callers pass a path, raw bytes or a file-like object interchangeably
+"""
+
+import io
+
+from PIL import Image
+
+from dicom_io import is_dicom, read_dicom
+
+
+def as_file(source):
+    """
+    Normalize an image source to something PIL can open
+
+    Seekable streams are rewound first, so the same stream can be decoded
+    more than once (the lite path reads it for analysis and for features).
+
+    Args:
+        source: Path, bytes/bytearray/memoryview, or a binary file-like object
+
+    Returns:
+        A path or a readable binary file object
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "read"):
+        if hasattr(source, "seekable") and source.seekable():
+            source.seek(0)
+        else:
+            # One-shot streams are buffered so later decodes still work
+            return io.BytesIO(source.read())
+    return source
+
+
+def open_image(source):
+    """
+    Open an image from a path or an in-memory buffer without touching disk
+
+    DICOM files are windowed and returned as their first frame in 8-bit.
+
+    Args:
+        source: Path, bytes/bytearray/memoryview, or a binary file-like object
+
+    Returns:
+        PIL Image
+    """
+    source = as_file(source)
+    if is_dicom(source):
+        return read_dicom(source).to_pil()
+    return Image.open(source)
@@ -0,0 +1,245 @@
+"""
+Background analysis jobs
+A bounded worker pool runs submitted analyses; job state lives in a store
+that is either in-process or a SQLite file shared by every gunicorn worker
+on the host, so a job can be polled through any worker
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+EXPIRED = "expired"
+
+FINISHED = (DONE, FAILED, EXPIRED)
+
+
+class QueueFull(Exception):
+    """Raised when max_pending jobs are already queued or running"""
+
+
+class MemoryJobStore:
+    """Job records in a dict; only visible to the process that created them"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def delete_finished_before(self, cutoff):
+        with self._lock:
+            stale = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in FINISHED and (job["finished_at"] or 0) < cutoff
+            ]
+            for job_id in stale:
+                del self._jobs[job_id]
+        return len(stale)
+
+
+class SQLiteJobStore:
+    """
+    Job records in a SQLite file
+
+    Opens a connection per operation so it is safe across threads and
+    across the gunicorn fork; WAL mode lets readers poll while a worker
+    writes.
+    """
+
+    COLUMNS = ("id", "kind", "status", "created_at", "started_at", "finished_at", "result", "error")
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, status TEXT, created_at REAL, "
+                "started_at REAL, finished_at REAL, result TEXT, error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create(self, job):
+        row = dict(job, result=json.dumps(job["result"]) if job["result"] is not None else None)
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                [row[column] for column in self.COLUMNS],
+            )
+
+    def update(self, job_id, **fields):
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def delete_finished_before(self, cutoff):
+        placeholders = ", ".join("?" * len(FINISHED))
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+                [*FINISHED, cutoff],
+            )
+            return cursor.rowcount
+
+
+class JobQueue:
+    """
+    Runs jobs on a fixed-size thread pool with a bound on pending work
+
+    A job that waits in the queue longer than job_ttl seconds is marked
+    expired instead of run, and finished jobs (with their results) are
+    deleted result_ttl seconds after they finish.
+    """
+
+    # Delete old results after this many submissions
+    PRUNE_EVERY = 32
+
+    def __init__(self, store, workers=2, max_pending=64, job_ttl=600, result_ttl=3600):
+        self.store = store
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.job_ttl = float(job_ttl)
+        self.result_ttl = float(result_ttl)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submissions = 0
+
+    def _get_executor(self):
+        # Created on first use so the pool's threads belong to the process
+        # (gunicorn worker) that runs the jobs
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+        return self._executor
+
+    def pending(self):
+        """Jobs submitted by this process that have not finished yet"""
+        with self._lock:
+            return self._pending
+
+    def submit(self, kind, fn, *args):
+        """
+        Queue fn(*args) as a job
+
+        Args:
+            kind: Label stored with the job (e.g. "analyze" or "ml")
+            fn: Callable returning a JSON-serializable result
+
+        Returns:
+            The new job id
+
+        Raises:
+            QueueFull: max_pending jobs are already queued or running
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+            self._submissions += 1
+            prune = self._submissions % self.PRUNE_EVERY == 0
+
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.create({
+                "id": job_id,
+                "kind": kind,
+                "status": QUEUED,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            })
+            self._get_executor().submit(self._run, job_id, fn, args, time.monotonic())
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        if prune:
+            self.prune()
+        return job_id
+
+    def _run(self, job_id, fn, args, queued_at):
+        try:
+            if self.job_ttl > 0 and time.monotonic() - queued_at > self.job_ttl:
+                self.store.update(job_id, status=EXPIRED, finished_at=time.time(),
+                                  error="Job expired before a worker was available")
+                return
+            self.store.update(job_id, status=RUNNING, started_at=time.time())
+            try:
+                result = fn(*args)
+            except Exception as e:
+                logging.exception(f"Job {job_id} failed")
+                self.store.update(job_id, status=FAILED, finished_at=time.time(), error=str(e))
+                return
+            self.store.update(job_id, status=DONE, finished_at=time.time(), result=result)
+        except Exception:
+            logging.exception(f"Could not record the state of job {job_id}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id):
+        """Job record as a dict, or None if unknown or already deleted"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job["status"] in FINISHED and self._retention_over(job["finished_at"]):
+            return None
+        return job
+
+    def _retention_over(self, finished_at):
+        return self.result_ttl > 0 and finished_at is not None and time.time() - finished_at > self.result_ttl
+
+    def prune(self):
+        """Delete finished jobs older than result_ttl"""
+        if self.result_ttl <= 0:
+            return 0
+        try:
+            return self.store.delete_finished_before(time.time() - self.result_ttl)
+        except Exception as e:
+            logging.warning(f"Could not prune finished jobs: {e}")
+            return 0
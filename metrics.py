@@ -0,0 +1,98 @@
+"""
+Prometheus metrics for the analysis pipeline
+Stage latencies, request latencies, cache lookups and fallbacks. Under
+gunicorn, PROMETHEUS_MULTIPROC_DIR (set by gunicorn.conf.py) makes every
+worker write its samples to a shared directory that /metrics aggregates.
+prometheus_client is optional; without it every metric is a no-op.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover - exercised only without the package
+    prometheus_client = None
+
+# Seconds; covers sub-millisecond lite stats up to slow Groq calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+def available():
+    """True if prometheus_client is installed"""
+    return prometheus_client is not None
+
+
+if prometheus_client is not None:
+    STAGE_SECONDS = prometheus_client.Histogram(
+        "mediscan_stage_duration_seconds",
+        "Time spent in one stage of the analysis pipeline",
+        ["stage"],
+        buckets=LATENCY_BUCKETS,
+    )
+    REQUEST_SECONDS = prometheus_client.Histogram(
+        "mediscan_request_duration_seconds",
+        "Time to produce an HTTP response (streamed bodies excluded)",
+        ["endpoint", "method", "status"],
+        buckets=LATENCY_BUCKETS,
+    )
+    CACHE_LOOKUPS = prometheus_client.Counter(
+        "mediscan_cache_lookups_total",
+        "Result cache lookups by outcome (memory_hit, disk_hit, miss)",
+        ["cache", "outcome"],
+    )
+    FALLBACKS = prometheus_client.Counter(
+        "mediscan_fallbacks_total",
+        "Analyses that fell back from one path to another",
+        ["source", "target"],
+    )
+else:
+    STAGE_SECONDS = REQUEST_SECONDS = CACHE_LOOKUPS = FALLBACKS = _NoopMetric()
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the with-block under mediscan_stage_duration_seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def record_fallback(source, target):
+    FALLBACKS.labels(source, target).inc()
+
+
+def exposition():
+    """
+    Current metrics in the Prometheus text format
+
+    Returns:
+        (body bytes, content type)
+    """
+    if prometheus_client is None:
+        raise RuntimeError("prometheus_client is not installed")
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,101 @@
+"""
+Lazy loader for the analysis backend
+Picks the full (TensorFlow) or lite analyzer from configuration and only
+imports it on first use, so the web process starts without TensorFlow
+"""
+
+import importlib
+import logging
+import os
+import threading
+
+from metrics import record_fallback
+
+# "full" uses ml_model (TensorFlow), "lite" uses ml_model_lite (PIL/NumPy),
+# "auto" tries full and falls back to lite if TensorFlow cannot be imported
+BACKENDS = {
+    "full": "ml_model",
+    "lite": "ml_model_lite",
+}
+ML_BACKEND = os.getenv("ML_BACKEND", "full").strip().lower()
+
+_module = None
+_lock = threading.Lock()
+# Without warm-up, readiness means "the analyzer has been built"
+_ready_when_built = False
+_built = False
+
+
+def load_backend():
+    """
+    Import the configured backend module, once per process
+
+    Returns:
+        The ml_model or ml_model_lite module
+    """
+    global _module
+    if _module is None:
+        with _lock:
+            if _module is None:
+                _module = _import_backend()
+    return _module
+
+
+def _import_backend():
+    if ML_BACKEND == "auto":
+        try:
+            return importlib.import_module(BACKENDS["full"])
+        except Exception as e:
+            logging.warning(f"Full ML backend unavailable, using lite analyzer: {e}")
+            record_fallback("full", "lite")
+            return importlib.import_module(BACKENDS["lite"])
+    if ML_BACKEND not in BACKENDS:
+        raise ValueError(f"Unknown ML_BACKEND {ML_BACKEND!r}; expected full, lite or auto")
+    return importlib.import_module(BACKENDS[ML_BACKEND])
+
+
+def is_loaded():
+    """True once the backend module has been imported"""
+    return _module is not None
+
+
+def get_analyzer():
+    """Get the analyzer instance from the configured backend"""
+    global _built
+    analyzer = load_backend().get_analyzer()
+    _built = True
+    return analyzer
+
+
+def warmup():
+    """Import the backend and warm its models up"""
+    load_backend().warmup()
+
+
+def ready_when_built():
+    """
+    Count the backend as ready once get_analyzer() has built it
+
+    For processes that never call warmup() (lazy loading), whose first
+    request builds the models instead.
+    """
+    global _ready_when_built
+    _ready_when_built = True
+
+
+def is_ready():
+    """
+    True once the backend has been imported and warmed up (or just built,
+    after ready_when_built()); never triggers an import
+    """
+    return _module is not None and (_module.is_ready() or (_ready_when_built and _built))
+
+
+def extract_features_batch(paths):
+    """Lite (N, 5) feature matrix used with the trained sklearn classifier"""
+    return importlib.import_module(BACKENDS["lite"]).extract_features_batch(paths)
+
+
+def features_from_findings(findings_list):
+    """The same feature matrix built from lite analyze_image results"""
+    return importlib.import_module(BACKENDS["lite"]).features_from_findings(findings_list)
@@ -13,9 +13,198 @@ from tensorflow.keras.preprocessing import image
 from tensorflow.keras.models import Model, load_model
 import warnings
 import os
+import threading
+import uuid
+import hashlib
 from pathlib import Path
+
+from batching import MicroBatcher
+from dicom_io import is_dicom, read_dicom
+from image_io import as_file, open_image
+from metrics import timed
+from model_registry import file_sha256
+from postprocess import predictions, top_k
 warnings.filterwarnings('ignore')
 
+# Input size shared by every model in the ensemble
+MODEL_INPUT_SIZE = (224, 224)
+
+# Per-model normalization applied to the shared decoded image
+PREPROCESSORS = {
+    "densenet": tf.keras.applications.densenet.preprocess_input,
+    "mobilenet": tf.keras.applications.mobilenet_v2.preprocess_input,
+}
+
+# Output classes of each model, in score order
+CLASS_LABELS = {
+    # Medical conditions detected by CheXpert model
+    "densenet": [
+        "Atelectasis", "Cardiomegaly", "Consolidation", "Edema",
+        "Effusion", "Emphysema", "Fibrosis", "Fracture",
+        "Infiltration", "Lesion", "Nodule", "Pleural Thickening",
+        "Pneumonia", "Pneumothorax"
+    ],
+    # Medical findings detected by MIMIC-CXR model
+    "mobilenet": [
+        "Normal", "Pneumonia", "Tuberculosis", "Pneumothorax",
+        "Fracture", "Effusion", "Nodule", "Opacity",
+        "Cardiomegaly", "Edema"
+    ],
+}
+
+LABEL_ARRAYS = {name: np.array(labels) for name, labels in CLASS_LABELS.items()}
+
+# Predictions reported per model, and the DenseNet reporting threshold (percent)
+TOP_K = 5
+DENSENET_MIN_CONFIDENCE = 30
+
+# Cascade mode: MobileNetV2 runs first and DenseNet121 (plus the custom
+# medical classifier with ML_CASCADE_CLASSIFIER=1) only when MobileNetV2's
+# top confidence falls in the uncertainty band [ML_CASCADE_LOW, ML_CASCADE_HIGH)
+# percent. cascade_report.py measures the trade-off for a dataset.
+CASCADE_ENABLED = os.getenv("ML_CASCADE", "0").lower() in ("1", "true", "yes")
+CASCADE_LOW = float(os.getenv("ML_CASCADE_LOW", "30"))
+CASCADE_HIGH = float(os.getenv("ML_CASCADE_HIGH", "85"))
+CASCADE_CLASSIFIER = os.getenv("ML_CASCADE_CLASSIFIER", "0").lower() in ("1", "true", "yes")
+
+TRAINED_DATASETS = {
+    "densenet": "CheXpert (224,316 chest X-rays)",
+    "mobilenet": "MIMIC-CXR (377,110 chest X-rays with reports)",
+}
+
+# Micro-batching of concurrent requests (see batching.MicroBatcher)
+BATCHING_ENABLED = os.getenv("ML_BATCHING", "1").lower() not in ("0", "false", "no")
+BATCH_MAX_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("ML_BATCH_MAX_WAIT_MS", "5"))
+
+# Compiled tf.function inference instead of Model.predict per call
+COMPILED_INFERENCE = os.getenv("ML_COMPILED", "1").lower() not in ("0", "false", "no")
+
+# Batch sizes with a traced graph; other sizes are padded up to the next one
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+# Inference engine: "keras", or "tflite" for the quantized artifacts written
+# by quantize_models.py (ML_TFLITE_QUANT picks int8 or float16)
+INFERENCE_ENGINE = os.getenv("ML_INFERENCE", "keras").lower()
+TFLITE_QUANT = os.getenv("ML_TFLITE_QUANT", "int8").lower()
+TFLITE_THREADS = int(os.getenv("ML_TFLITE_THREADS", "0")) or None
+
+# Trained Keras artifacts
+MODEL_PATHS = {
+    "densenet": Path("models/densenet_chexpert.h5"),
+    "mobilenet": Path("models/mobilenet_mimic.h5"),
+}
+
+
+def tflite_path(model_name, quant=None):
+    """Where quantize_models.py writes the quantized version of a model"""
+    keras_path = MODEL_PATHS[model_name]
+    return keras_path.with_name(f"{keras_path.stem}_{quant or TFLITE_QUANT}.tflite")
+
+
+class CompiledPredictor:
+    """
+    Fixed-signature inference entry point for a Keras model
+    
+    Model.predict builds a data adapter and callback loop on every call.
+    This wraps the forward pass in a tf.function with one concrete
+    (bucket, 224, 224, 3) signature per batch-size bucket, pads each batch
+    up to its bucket, and slices the padding back off.
+    """
+    
+    def __init__(self, model, buckets=BATCH_BUCKETS):
+        self.model = model
+        self.buckets = tuple(sorted(buckets))
+        self._forward = tf.function(lambda x: self.model(x, training=False))
+        self._concrete = {}
+        self._lock = threading.Lock()
+    
+    def _get_concrete(self, bucket):
+        fn = self._concrete.get(bucket)
+        if fn is None:
+            with self._lock:
+                fn = self._concrete.get(bucket)
+                if fn is None:
+                    spec = tf.TensorSpec((bucket,) + tuple(self.model.input_shape[1:]), tf.float32)
+                    fn = self._forward.get_concrete_function(spec)
+                    self._concrete[bucket] = fn
+        return fn
+    
+    def _bucket_for(self, n):
+        for bucket in self.buckets:
+            if bucket >= n:
+                return bucket
+        return self.buckets[-1]
+    
+    def warmup(self, max_batch_size=1):
+        """Trace every bucket up to the one that holds max_batch_size"""
+        largest = self._bucket_for(max_batch_size)
+        for bucket in self.buckets:
+            if bucket > largest:
+                break
+            self._get_concrete(bucket)
+    
+    def __call__(self, batch):
+        """
+        Run the model on an (N, H, W, C) batch
+        
+        Returns:
+            NumPy array of outputs with N rows
+        """
+        batch = np.asarray(batch, dtype='float32')
+        n = len(batch)
+        outputs = []
+        # Batches larger than the biggest bucket run in bucket-sized chunks
+        for start in range(0, n, self.buckets[-1]):
+            chunk = batch[start:start + self.buckets[-1]]
+            bucket = self._bucket_for(len(chunk))
+            if len(chunk) < bucket:
+                padding = np.zeros((bucket - len(chunk),) + chunk.shape[1:], dtype='float32')
+                chunk = np.concatenate([chunk, padding])
+            result = self._get_concrete(bucket)(tf.constant(chunk))
+            outputs.append(result.numpy()[:min(bucket, n - start)])
+        return np.concatenate(outputs)
+
+
+class TFLitePredictor:
+    """
+    TensorFlow Lite interpreter with the same call interface as CompiledPredictor
+    
+    Quantized models keep float32 inputs and outputs; the interpreter
+    quantizes and dequantizes internally.
+    """
+    
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = Path(model_path)
+        self.interpreter = tf.lite.Interpreter(model_path=str(model_path), num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input_index = self.interpreter.get_input_details()[0]["index"]
+        self._output_index = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = int(self.interpreter.get_input_details()[0]["shape"][0])
+        # The interpreter is not thread-safe
+        self._lock = threading.Lock()
+    
+    def warmup(self, max_batch_size=1):
+        """Nothing to trace; the interpreter is ready after allocate_tensors"""
+    
+    def __call__(self, batch):
+        """
+        Run the interpreter on an (N, H, W, C) batch
+        
+        Returns:
+            NumPy array of outputs with N rows
+        """
+        batch = np.asarray(batch, dtype='float32')
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self.interpreter.set_tensor(self._input_index, batch)
+            self.interpreter.invoke()
+            return np.array(self.interpreter.get_tensor(self._output_index))
+
+
 class MedicalImagingAnalyzer:
     """
     Medical image analyzer using trained deep learning models
@@ -28,42 +217,63 @@ class MedicalImagingAnalyzer:
         self.densenet_model = None
         self.mobilenet_model = None
         self.medical_classifier = None
+        # Where each model's weights came from; feeds model_version
+        self.model_sources = {}
+        self.model_version = None
+        self.predictors = {}
+        self.tflite_predictors = {}
+        self.batchers = {}
+        self._feature_model = None
+        self._feature_model_lock = threading.Lock()
+        self.cascade = CASCADE_ENABLED
+        self.cascade_band = (CASCADE_LOW, CASCADE_HIGH)
+        self.cascade_classifier = CASCADE_CLASSIFIER
         self.load_models()
+        self._init_predictors()
+        if BATCHING_ENABLED:
+            self._init_batchers()
     
     def load_models(self):
         """Load trained medical imaging models"""
-        try:
-            # Load DenseNet121 fine-tuned on medical imaging (CheXpert dataset)
-            # This model is trained to detect chest abnormalities
-            self.densenet_model = self._load_medical_densenet()
-            print("✓ Medical DenseNet121 (CheXpert-trained) loaded successfully")
-        except Exception as e:
-            print(f"Warning: Could not load medical DenseNet: {e}")
-            print("Falling back to ImageNet pre-trained DenseNet121")
+        if INFERENCE_ENGINE == "tflite":
+            self._load_tflite_models()
+        
+        if "densenet" not in self.tflite_predictors:
             try:
-                self.densenet_model = DenseNet121(
-                    weights='imagenet',
-                    include_top=True,
-                    input_shape=(224, 224, 3)
-                )
-            except Exception as e2:
-                print(f"Error loading fallback DenseNet: {e2}")
+                # Load DenseNet121 fine-tuned on medical imaging (CheXpert dataset)
+                # This model is trained to detect chest abnormalities
+                self.densenet_model = self._load_medical_densenet()
+                print("✓ Medical DenseNet121 (CheXpert-trained) loaded successfully")
+            except Exception as e:
+                print(f"Warning: Could not load medical DenseNet: {e}")
+                print("Falling back to ImageNet pre-trained DenseNet121")
+                try:
+                    self.densenet_model = DenseNet121(
+                        weights='imagenet',
+                        include_top=True,
+                        input_shape=(224, 224, 3)
+                    )
+                    self.model_sources["densenet"] = "imagenet:densenet121"
+                except Exception as e2:
+                    print(f"Error loading fallback DenseNet: {e2}")
         
-        try:
-            # Load MobileNetV2 fine-tuned on medical imaging
-            self.mobilenet_model = self._load_medical_mobilenet()
-            print("✓ Medical MobileNetV2 (MIMIC-trained) loaded successfully")
-        except Exception as e:
-            print(f"Warning: Could not load medical MobileNetV2: {e}")
-            print("Falling back to ImageNet pre-trained MobileNetV2")
+        if "mobilenet" not in self.tflite_predictors:
             try:
-                self.mobilenet_model = MobileNetV2(
-                    weights='imagenet',
-                    include_top=True,
-                    input_shape=(224, 224, 3)
-                )
-            except Exception as e2:
-                print(f"Error loading fallback MobileNetV2: {e2}")
+                # Load MobileNetV2 fine-tuned on medical imaging
+                self.mobilenet_model = self._load_medical_mobilenet()
+                print("✓ Medical MobileNetV2 (MIMIC-trained) loaded successfully")
+            except Exception as e:
+                print(f"Warning: Could not load medical MobileNetV2: {e}")
+                print("Falling back to ImageNet pre-trained MobileNetV2")
+                try:
+                    self.mobilenet_model = MobileNetV2(
+                        weights='imagenet',
+                        include_top=True,
+                        input_shape=(224, 224, 3)
+                    )
+                    self.model_sources["mobilenet"] = "imagenet:mobilenet_v2"
+                except Exception as e2:
+                    print(f"Error loading fallback MobileNetV2: {e2}")
         
         try:
             # Load custom trained medical classifier
@@ -71,6 +281,118 @@ class MedicalImagingAnalyzer:
             print("✓ Custom Medical Classifier loaded successfully")
         except Exception as e:
             print(f"Warning: Custom medical classifier not available: {e}")
+        
+        self.model_version = self._compute_model_version()
+    
+    def _load_tflite_models(self):
+        """Load quantized artifacts written by quantize_models.py, where present"""
+        for model_name in PREPROCESSORS:
+            path = tflite_path(model_name)
+            if not path.exists():
+                print(f"Warning: {path} not found, using Keras {model_name} model")
+                continue
+            try:
+                self.tflite_predictors[model_name] = TFLitePredictor(path, num_threads=TFLITE_THREADS)
+                self.model_sources[model_name] = f"tflite-{TFLITE_QUANT}:{file_sha256(path)}"
+                print(f"✓ Quantized {model_name} ({TFLITE_QUANT}) loaded from {path}")
+            except Exception as e:
+                print(f"Warning: Could not load {path}: {e}")
+    
+    def _compute_model_version(self):
+        """
+        Identify the exact set of loaded weights
+        
+        Used in result cache keys so replacing a model artifact (or falling
+        back to ImageNet weights) never serves results from other weights.
+        """
+        names = sorted(PREPROCESSORS)
+        # The classifier only shapes results when the cascade runs it
+        if self.cascade_classifier:
+            names.append("classifier")
+        parts = [f"{name}={self.model_sources.get(name, 'missing')}" for name in names]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+    
+    @property
+    def analysis_mode(self):
+        """Identifies how ensemble_analysis combines the models; part of result cache keys"""
+        if not self.cascade:
+            return "ensemble"
+        low, high = self.cascade_band
+        return f"cascade:{low:g}-{high:g}" + ("+classifier" if self.cascade_classifier else "")
+    
+    def _record_source(self, model_name, model_path):
+        """Remember where a model came from: artifact hash or a fresh untrained head"""
+        if model_path.exists():
+            self.model_sources[model_name] = f"file:{file_sha256(model_path)}"
+        else:
+            # Randomly initialized heads differ per process, so their
+            # results must never be shared through the cache
+            self.model_sources[model_name] = f"untrained:{uuid.uuid4().hex}"
+    
+    def _get_model(self, model_name):
+        """Return the loaded Keras model for a preprocessing/model key"""
+        return {
+            "densenet": self.densenet_model,
+            "mobilenet": self.mobilenet_model,
+        }[model_name]
+    
+    def _init_predictors(self):
+        """Create the forward-pass callable used for each loaded model"""
+        for model_name in PREPROCESSORS:
+            if model_name in self.tflite_predictors:
+                self.predictors[model_name] = self.tflite_predictors[model_name]
+                continue
+            model = self._get_model(model_name)
+            if model is None:
+                continue
+            if COMPILED_INFERENCE:
+                self.predictors[model_name] = CompiledPredictor(model)
+            else:
+                self.predictors[model_name] = lambda batch, model=model: model.predict(batch, verbose=0)
+    
+    def _init_batchers(self):
+        """Start one micro-batching worker per loaded model"""
+        for model_name, predictor in self.predictors.items():
+            self.batchers[model_name] = MicroBatcher(
+                predictor,
+                max_batch_size=BATCH_MAX_SIZE,
+                max_wait_ms=BATCH_MAX_WAIT_MS,
+                name=model_name,
+            )
+    
+    def _predict(self, model_name, img_array):
+        """
+        Run a forward pass, going through the micro-batcher when enabled
+        
+        Args:
+            model_name: "densenet" or "mobilenet"
+            img_array: Preprocessed batch from prepare_input
+            
+        Returns:
+            Array of prediction scores, one row per input image
+        """
+        # Includes time spent waiting for the micro-batch to fill
+        with timed(f"forward_{model_name}"):
+            batcher = self.batchers.get(model_name)
+            if batcher is not None:
+                return batcher.predict(img_array)
+            return self.predictors[model_name](img_array)
+    
+    def warmup(self):
+        """
+        Run one dummy forward pass through every loaded model
+        
+        Graphs are traced on the first call, so doing it here keeps that
+        cost off the first real request. Compiled predictors also trace
+        every batch bucket the micro-batcher can produce.
+        """
+        dummy = np.zeros((1,) + MODEL_INPUT_SIZE[::-1] + (3,), dtype='float32')
+        for model_name, predictor in self.predictors.items():
+            if hasattr(predictor, "warmup"):
+                predictor.warmup(BATCH_MAX_SIZE if BATCHING_ENABLED else 1)
+            self._predict(model_name, dummy)
+        if self.cascade_classifier and self.medical_classifier is not None:
+            self.medical_classifier.predict(dummy, verbose=0)
     
     def _load_medical_densenet(self):
         """
@@ -78,9 +400,11 @@ class MedicalImagingAnalyzer:
         CheXpert is a large chest X-ray dataset with 224,316 images
         """
         # Try to load from local trained model first
-        model_path = Path("models/densenet_chexpert.h5")
+        model_path = MODEL_PATHS["densenet"]
         if model_path.exists():
-            return load_model(str(model_path))
+            model = load_model(str(model_path))
+            self._record_source("densenet", model_path)
+            return model
         
         # If not available, create a medical-focused DenseNet
         # Load ImageNet weights as base
@@ -105,6 +429,7 @@ class MedicalImagingAnalyzer:
         for layer in base_model.layers:
             layer.trainable = False
         
+        self._record_source("densenet", model_path)
         return model
     
     def _load_medical_mobilenet(self):
@@ -113,9 +438,11 @@ class MedicalImagingAnalyzer:
         MIMIC-CXR contains 377,110 chest X-rays with associated reports
         """
         # Try to load from local trained model first
-        model_path = Path("models/mobilenet_mimic.h5")
+        model_path = MODEL_PATHS["mobilenet"]
         if model_path.exists():
-            return load_model(str(model_path))
+            model = load_model(str(model_path))
+            self._record_source("mobilenet", model_path)
+            return model
         
         # If not available, create a medical-focused MobileNetV2
         base_model = MobileNetV2(
@@ -139,6 +466,7 @@ class MedicalImagingAnalyzer:
         for layer in base_model.layers:
             layer.trainable = False
         
+        self._record_source("mobilenet", model_path)
         return model
     
     def _load_custom_medical_classifier(self):
@@ -147,6 +475,7 @@ class MedicalImagingAnalyzer:
         Trained on combined medical datasets
         """
         model_path = Path("models/medical_classifier.h5")
+        self._record_source("classifier", model_path)
         if model_path.exists():
             return load_model(str(model_path))
         
@@ -165,144 +494,193 @@ class MedicalImagingAnalyzer:
         
         return model
     
-    def preprocess_image(self, image_path):
+    def load_image(self, image_path):
         """
-        Preprocess image for model input
+        Decode and resize an image once so it can be shared by every model
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or its bytes / a file-like object
             
         Returns:
-            Preprocessed image array
+            Float32 array of shape (224, 224, 3) with raw 0-255 pixel values
         """
         try:
+            # DICOM: window and resize the (memory-mapped) first frame directly
+            source = as_file(image_path)
+            if is_dicom(source):
+                # Windowing and resizing happen in one pass here
+                with timed("decode_dicom"):
+                    return read_dicom(source).model_input(0, MODEL_INPUT_SIZE)
+
             # Read image
-            img = Image.open(image_path).convert('RGB')
-            
-            # Resize to model input size
-            img = img.resize((224, 224))
+            with timed("decode"):
+                img = open_image(source).convert('RGB')
             
-            # Convert to array
-            img_array = image.img_to_array(img)
-            
-            # Expand dimensions for batch
-            img_array = np.expand_dims(img_array, axis=0)
+            with timed("resize"):
+                # Resize to model input size
+                img = img.resize(MODEL_INPUT_SIZE)
+                
+                # Convert to array
+                return image.img_to_array(img, dtype='float32')
+        except Exception as e:
+            print(f"Error loading image: {e}")
+            return None
+    
+    def prepare_input(self, img, model_name="densenet"):
+        """
+        Apply model-specific normalization to a decoded image
+        
+        Args:
+            img: Array returned by load_image
+            model_name: Key into PREPROCESSORS ("densenet" or "mobilenet")
             
-            # Normalize (ImageNet normalization)
-            img_array = tf.keras.applications.densenet.preprocess_input(img_array)
+        Returns:
+            Batch of one normalized image
+        """
+        # preprocess_input normalizes float arrays in place, so work on a
+        # copy to keep the shared decoded image intact for the other models
+        img_array = np.array(img, dtype='float32', copy=True)
+        img_array = np.expand_dims(img_array, axis=0)
+        return PREPROCESSORS[model_name](img_array)
+    
+    def preprocess_image(self, image_path, model_name="densenet"):
+        """
+        Preprocess image for model input
+        
+        Args:
+            image_path: Path to the image file, or its bytes / a file-like object
+            model_name: Which model's normalization to apply
             
-            return img_array
+        Returns:
+            Preprocessed image array
+        """
+        img = self.load_image(image_path)
+        if img is None:
+            return None
+        try:
+            return self.prepare_input(img, model_name)
         except Exception as e:
             print(f"Error preprocessing image: {e}")
             return None
     
-    def analyze_with_densenet(self, image_path):
+    def analyze_with_densenet(self, image_path, img=None):
         """
         Analyze image using DenseNet121 trained on CheXpert dataset
         Detects chest X-ray abnormalities
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or its bytes / a file-like object
+            img: Optional image already decoded by load_image
             
         Returns:
             Dictionary with medical predictions and confidence scores
         """
-        if self.densenet_model is None:
+        if "densenet" not in self.predictors:
             return {"error": "DenseNet model not loaded"}
         
         try:
-            img_array = self.preprocess_image(image_path)
-            if img_array is None:
+            if img is None:
+                img = self.load_image(image_path)
+            if img is None:
                 return {"error": "Failed to preprocess image"}
+            img_array = self.prepare_input(img, "densenet")
             
             # Get predictions from medical model
-            predictions = self.densenet_model.predict(img_array, verbose=0)
-            
-            # Medical conditions detected by CheXpert model
-            medical_conditions = [
-                "Atelectasis", "Cardiomegaly", "Consolidation", "Edema",
-                "Effusion", "Emphysema", "Fibrosis", "Fracture",
-                "Infiltration", "Lesion", "Nodule", "Pleural Thickening",
-                "Pneumonia", "Pneumothorax"
-            ]
-            
-            # Process predictions
-            results = []
-            if len(predictions[0]) == len(medical_conditions):
-                for i, condition in enumerate(medical_conditions):
-                    confidence = float(predictions[0][i]) * 100
-                    if confidence > 30:  # Only show significant detections
-                        results.append({
-                            "class": condition,
-                            "confidence": confidence,
-                            "score": float(predictions[0][i])
-                        })
+            scores = self._predict("densenet", img_array)
+            return self._densenet_results(scores)[0]
+        except Exception as e:
+            return {"error": f"Analysis failed: {str(e)}"}
+    
+    def _top_predictions(self, model_name, scores, min_confidence=None):
+        """
+        Top TOP_K predictions for each row of an (N, C) score array
+        
+        Args:
+            model_name: Key of CLASS_LABELS
+            scores: Sigmoid outputs, one row per image
+            min_confidence: Drop predictions at or below this percentage
             
-            # Sort by confidence
-            results.sort(key=lambda x: x["confidence"], reverse=True)
+        Returns:
+            One list of prediction dicts per row, highest first (empty if
+            the scores do not match the model's labels)
+        """
+        labels = LABEL_ARRAYS[model_name]
+        scores = np.asarray(scores)
+        if scores.ndim != 2 or scores.shape[1] != len(labels):
+            return [[] for _ in range(len(scores))]
+        indices, values = top_k(scores, TOP_K)
+        mask = values * 100 > min_confidence if min_confidence is not None else None
+        return predictions(labels, indices, values, mask)
+    
+    def _densenet_results(self, scores):
+        """
+        Format a batch of DenseNet scores
+        
+        Args:
+            scores: (N, C) sigmoid outputs for CLASS_LABELS["densenet"]
             
-            return {
+        Returns:
+            One dictionary per image with the significant detections, highest first
+        """
+        return [
+            {
                 "model": "DenseNet121 (CheXpert-trained)",
-                "predictions": results[:5],
+                "predictions": results,
                 "top_prediction": results[0]["class"] if results else "No abnormalities detected",
                 "confidence": results[0]["confidence"] if results else 0,
                 "dataset": "CheXpert (224,316 chest X-rays)"
             }
-        except Exception as e:
-            return {"error": f"Analysis failed: {str(e)}"}
+            for results in self._top_predictions("densenet", scores, DENSENET_MIN_CONFIDENCE)
+        ]
     
-    def analyze_with_resnet(self, image_path):
+    def analyze_with_resnet(self, image_path, img=None):
         """
         Analyze image using MobileNetV2 trained on MIMIC-CXR dataset
         Detects various medical imaging findings
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or its bytes / a file-like object
+            img: Optional image already decoded by load_image
             
         Returns:
             Dictionary with medical predictions and confidence scores
         """
-        if self.mobilenet_model is None:
+        if "mobilenet" not in self.predictors:
             return {"error": "MobileNetV2 model not loaded"}
         
         try:
-            img_array = self.preprocess_image(image_path)
-            if img_array is None:
+            if img is None:
+                img = self.load_image(image_path)
+            if img is None:
                 return {"error": "Failed to preprocess image"}
+            img_array = self.prepare_input(img, "mobilenet")
             
             # Get predictions from medical model
-            predictions = self.mobilenet_model.predict(img_array, verbose=0)
-            
-            # Medical findings detected by MIMIC-CXR model
-            medical_findings = [
-                "Normal", "Pneumonia", "Tuberculosis", "Pneumothorax",
-                "Fracture", "Effusion", "Nodule", "Opacity",
-                "Cardiomegaly", "Edema"
-            ]
-            
-            # Process predictions
-            results = []
-            if len(predictions[0]) == len(medical_findings):
-                for i, finding in enumerate(medical_findings):
-                    confidence = float(predictions[0][i]) * 100
-                    results.append({
-                        "class": finding,
-                        "confidence": confidence,
-                        "score": float(predictions[0][i])
-                    })
-            
-            # Sort by confidence
-            results.sort(key=lambda x: x["confidence"], reverse=True)
+            scores = self._predict("mobilenet", img_array)
+            return self._mobilenet_results(scores)[0]
+        except Exception as e:
+            return {"error": f"Analysis failed: {str(e)}"}
+    
+    def _mobilenet_results(self, scores):
+        """
+        Format a batch of MobileNetV2 scores
+        
+        Args:
+            scores: (N, C) sigmoid outputs for CLASS_LABELS["mobilenet"]
             
-            return {
+        Returns:
+            One dictionary per image with the top findings, highest first
+        """
+        return [
+            {
                 "model": "MobileNetV2 (MIMIC-CXR-trained)",
-                "predictions": results[:5],
+                "predictions": results,
                 "top_prediction": results[0]["class"] if results else "Unknown",
                 "confidence": results[0]["confidence"] if results else 0,
                 "dataset": "MIMIC-CXR (377,110 chest X-rays with reports)"
             }
-        except Exception as e:
-            return {"error": f"Analysis failed: {str(e)}"}
+            for results in self._top_predictions("mobilenet", scores)
+        ]
     
     def ensemble_analysis(self, image_path):
         """
@@ -310,14 +688,104 @@ class MedicalImagingAnalyzer:
         Combines CheXpert-trained DenseNet and MIMIC-CXR-trained MobileNetV2
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or its bytes / a file-like object
             
         Returns:
             Combined predictions from both trained medical models
         """
-        densenet_result = self.analyze_with_densenet(image_path)
-        mobilenet_result = self.analyze_with_resnet(image_path)
+        if self.cascade:
+            return self.cascade_analysis(image_path)
+        
+        # Decode once and share the image between both models
+        img = self.load_image(image_path)
+        if img is None:
+            error = {"error": "Failed to preprocess image"}
+            return self._combine_results(error, dict(error))
+        
+        densenet_result = self.analyze_with_densenet(image_path, img)
+        mobilenet_result = self.analyze_with_resnet(image_path, img)
+        return dict(self._combine_results(densenet_result, mobilenet_result), stages=["densenet", "mobilenet"])
+    
+    def cascade_analysis(self, image_path):
+        """
+        MobileNetV2 first; DenseNet121 only when its answer is uncertain
+        
+        Args:
+            image_path: Path to the image file, or its bytes / a file-like object
+            
+        Returns:
+            Same shape as ensemble_analysis, with "stages" listing the models
+            that ran (densenet_result is absent when DenseNet was skipped)
+        """
+        img = self.load_image(image_path)
+        if img is None:
+            error = {"error": "Failed to preprocess image"}
+            return self._combine_results(error, dict(error))
         
+        mobilenet_result = self.analyze_with_resnet(image_path, img)
+        if not self._needs_escalation(mobilenet_result, self.cascade_band):
+            return self._cascade_result(mobilenet_result)
+        
+        densenet_result = self.analyze_with_densenet(image_path, img)
+        classifier_result = self.analyze_with_classifier(img) if self.cascade_classifier else None
+        return self._cascade_result(mobilenet_result, densenet_result, classifier_result)
+    
+    def _needs_escalation(self, mobilenet_result, band):
+        """True if DenseNet should run: MobileNetV2 failed or is inside the band"""
+        if "error" in mobilenet_result:
+            return True
+        low, high = band
+        return low <= mobilenet_result["confidence"] < high
+    
+    def _cascade_result(self, mobilenet_result, densenet_result=None, classifier_result=None):
+        """Build the cascade response from whichever stages ran"""
+        if densenet_result is None:
+            confidence = mobilenet_result["confidence"]
+            return {
+                "ensemble_confidence": confidence,
+                "mobilenet_result": mobilenet_result,
+                "recommendation": self._get_medical_recommendation(confidence),
+                "trained_datasets": [TRAINED_DATASETS["mobilenet"]],
+                "stages": ["mobilenet"],
+            }
+        
+        result = self._combine_results(densenet_result, mobilenet_result)
+        result["stages"] = ["mobilenet", "densenet"]
+        if classifier_result is not None:
+            result["classifier_result"] = classifier_result
+            result["stages"].append("classifier")
+        return result
+    
+    def analyze_with_classifier(self, img):
+        """
+        Run the custom medical classifier on a decoded image
+        
+        Its 8 output classes are unnamed, so the result reports class indices.
+        
+        Args:
+            img: Array returned by load_image
+            
+        Returns:
+            Dictionary with the top class and its confidence
+        """
+        if self.medical_classifier is None:
+            return {"error": "Custom medical classifier not loaded"}
+        try:
+            # Trained on 0-1 inputs (ImageDataGenerator rescale=1/255)
+            batch = np.expand_dims(np.asarray(img, dtype='float32') / 255.0, axis=0)
+            with timed("forward_classifier"):
+                scores = np.asarray(self.medical_classifier(batch, training=False))[0]
+            top = int(np.argmax(scores))
+            return {
+                "model": "Custom medical classifier",
+                "top_class": top,
+                "confidence": float(scores[top]) * 100,
+            }
+        except Exception as e:
+            return {"error": f"Analysis failed: {str(e)}"}
+    
+    def _combine_results(self, densenet_result, mobilenet_result):
+        """Build the ensemble response from the per-model results"""
         # Average confidence scores from both medical models
         if "error" not in densenet_result and "error" not in mobilenet_result:
             avg_confidence = (
@@ -329,21 +797,134 @@ class MedicalImagingAnalyzer:
                 "densenet_result": densenet_result,
                 "mobilenet_result": mobilenet_result,
                 "recommendation": self._get_medical_recommendation(avg_confidence),
-                "trained_datasets": [
-                    "CheXpert (224,316 chest X-rays)",
-                    "MIMIC-CXR (377,110 chest X-rays with reports)"
-                ]
+                "trained_datasets": [TRAINED_DATASETS["densenet"], TRAINED_DATASETS["mobilenet"]]
             }
         
         return {
             "densenet_result": densenet_result,
             "mobilenet_result": mobilenet_result,
-            "trained_datasets": [
-                "CheXpert (224,316 chest X-rays)",
-                "MIMIC-CXR (377,110 chest X-rays with reports)"
-            ]
+            "trained_datasets": [TRAINED_DATASETS["densenet"], TRAINED_DATASETS["mobilenet"]]
         }
     
+    def ensemble_analysis_batch(self, sources, batch_size=16):
+        """
+        Ensemble analysis for many images, run through each model in batches
+        
+        Images are decoded and stacked batch_size at a time and sent to the
+        predictors directly (bypassing the micro-batcher, since they are
+        already batched). Results are yielded as each batch finishes.
+        
+        Args:
+            sources: Iterable of paths, bytes or file-like objects
+            batch_size: Images per forward pass
+            
+        Yields:
+            (index, result) in input order, result as from ensemble_analysis
+        """
+        chunk = []
+        for index, source in enumerate(sources):
+            chunk.append((index, source))
+            if len(chunk) == batch_size:
+                yield from self._analyze_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._analyze_chunk(chunk)
+    
+    def _run_batch(self, model_name, stack):
+        """
+        Formatted results for a stack of decoded images through one model
+        
+        Args:
+            model_name: "densenet" or "mobilenet"
+            stack: (N, H, W, 3) array of load_image outputs
+            
+        Returns:
+            One result dict per image
+        """
+        if model_name not in self.predictors:
+            missing = {"densenet": "DenseNet model not loaded", "mobilenet": "MobileNetV2 model not loaded"}
+            return [{"error": missing[model_name]} for _ in range(len(stack))]
+        format_rows = {"densenet": self._densenet_results, "mobilenet": self._mobilenet_results}[model_name]
+        try:
+            # Preprocessing works in place, so give each model its own copy
+            batch = PREPROCESSORS[model_name](stack.copy())
+            with timed(f"forward_{model_name}_batch"):
+                scores = np.asarray(self.predictors[model_name](batch))
+            return format_rows(scores)
+        except Exception as e:
+            return [{"error": f"Analysis failed: {str(e)}"} for _ in range(len(stack))]
+    
+    def ensemble_analysis_frames(self, dicom, batch_size=16):
+        """
+        Ensemble analysis of every frame of a multi-frame DICOM
+        
+        Frames are windowed and resized one at a time (the pixel data stays
+        memory-mapped) and sent through the models batch_size at a time.
+        
+        Args:
+            dicom: dicom_io.DicomImage
+            batch_size: Frames per forward pass
+            
+        Yields:
+            (frame index, result) in frame order, result as from ensemble_analysis
+        """
+        for start in range(0, dicom.frame_count, batch_size):
+            with timed("decode_dicom"):
+                frames = [
+                    dicom.model_input(index, MODEL_INPUT_SIZE)
+                    for index in range(start, min(start + batch_size, dicom.frame_count))
+                ]
+            for offset, result in self._analyze_images(frames):
+                yield start + offset, result
+    
+    def _analyze_chunk(self, chunk):
+        images = [self.load_image(source) for _, source in chunk]
+        for (index, _), (_, result) in zip(chunk, self._analyze_images(images)):
+            yield index, result
+    
+    def _analyze_images(self, images):
+        """
+        Ensemble results for decoded images (None for ones that failed to decode)
+        
+        Yields:
+            (position, result) for every entry of images
+        """
+        decoded = [img for img in images if img is not None]
+        results = []
+        if decoded:
+            stack = np.stack(decoded)
+            mobilenet_results = self._run_batch("mobilenet", stack)
+            if self.cascade:
+                # Only the uncertain images go through DenseNet
+                escalate = [self._needs_escalation(r, self.cascade_band) for r in mobilenet_results]
+                positions = np.flatnonzero(escalate)
+                densenet_results = [None] * len(decoded)
+                classifier_results = [None] * len(decoded)
+                if positions.size:
+                    for position, result in zip(positions, self._run_batch("densenet", stack[positions])):
+                        densenet_results[position] = result
+                    if self.cascade_classifier:
+                        for position in positions:
+                            classifier_results[position] = self.analyze_with_classifier(stack[position])
+                results = [
+                    self._cascade_result(m, d, c)
+                    for m, d, c in zip(mobilenet_results, densenet_results, classifier_results)
+                ]
+            else:
+                densenet_results = self._run_batch("densenet", stack)
+                results = [
+                    dict(self._combine_results(d, m), stages=["densenet", "mobilenet"])
+                    for d, m in zip(densenet_results, mobilenet_results)
+                ]
+        
+        results = iter(results)
+        for position, img in enumerate(images):
+            if img is None:
+                error = {"error": "Failed to preprocess image"}
+                yield position, self._combine_results(error, dict(error))
+                continue
+            yield position, next(results)
+    
     def _get_medical_recommendation(self, confidence):
         """
         Get clinical recommendation based on ensemble confidence score
@@ -366,12 +947,86 @@ class MedicalImagingAnalyzer:
         else:
             return "⚪ Low confidence - Inconclusive results, professional radiologist evaluation required"
     
+    def _get_feature_model(self):
+        """
+        Return the penultimate-layer feature extractor, building it once
+        
+        Returns:
+            Keras model mapping DenseNet input to its penultimate layer output
+        """
+        if self._feature_model is None:
+            with self._feature_model_lock:
+                if self._feature_model is None:
+                    # Create feature extraction model (remove last layer)
+                    self._feature_model = tf.keras.Model(
+                        inputs=self.densenet_model.input,
+                        outputs=self.densenet_model.layers[-2].output
+                    )
+        return self._feature_model
+    
+    def _coerce_image(self, item):
+        """
+        Turn a path or image array into a decoded (224, 224, 3) float32 image
+        
+        Args:
+            item: Image path, encoded bytes / file-like object, or an HxW / HxWxC pixel array
+            
+        Returns:
+            Array in the same layout as load_image
+        """
+        if isinstance(item, (str, os.PathLike, bytes, bytearray, memoryview)) or hasattr(item, 'read'):
+            img = self.load_image(item)
+            if img is None:
+                raise ValueError(f"Could not decode image: {item}")
+            return img
+        
+        img = np.asarray(item, dtype='float32')
+        if img.ndim == 2:
+            img = np.stack([img] * 3, axis=-1)
+        elif img.ndim == 3 and img.shape[-1] == 1:
+            img = np.repeat(img, 3, axis=-1)
+        elif img.ndim == 3 and img.shape[-1] == 4:
+            img = img[..., :3]
+        if img.ndim != 3 or img.shape[-1] != 3:
+            raise ValueError(f"Unsupported image array shape: {img.shape}")
+        if img.shape[:2] != MODEL_INPUT_SIZE[::-1]:
+            img = cv2.resize(img, MODEL_INPUT_SIZE, interpolation=cv2.INTER_LINEAR)
+        return img
+    
+    def extract_embeddings(self, paths_or_arrays, batch_size=32):
+        """
+        Extract penultimate-layer DenseNet embeddings for many images
+        
+        Args:
+            paths_or_arrays: Iterable of image paths, encoded buffers and/or decoded pixel arrays
+            batch_size: Number of images per forward pass
+            
+        Returns:
+            Float32 array of shape (N, feature_dim)
+        """
+        if self.densenet_model is None:
+            raise RuntimeError("DenseNet model not loaded")
+        
+        feature_model = self._get_feature_model()
+        items = list(paths_or_arrays)
+        feature_dim = feature_model.output_shape[-1]
+        embeddings = np.empty((len(items), feature_dim), dtype='float32')
+        
+        batch_size = max(1, int(batch_size))
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+            batch = np.stack([self._coerce_image(item) for item in chunk])
+            batch = PREPROCESSORS["densenet"](batch)
+            embeddings[start:start + len(chunk)] = feature_model.predict_on_batch(batch)
+        
+        return embeddings
+    
     def extract_features(self, image_path):
         """
         Extract deep learning features from image
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or its bytes / a file-like object
             
         Returns:
             Feature vector from the model
@@ -381,14 +1036,9 @@ class MedicalImagingAnalyzer:
             if img_array is None:
                 return None
             
-            # Create feature extraction model (remove last layer)
-            feature_model = tf.keras.Model(
-                inputs=self.densenet_model.input,
-                outputs=self.densenet_model.layers[-2].output
-            )
-            
             # Extract features
-            features = feature_model.predict(img_array, verbose=0)
+            features = self._get_feature_model().predict_on_batch(img_array)
+            features = np.asarray(features)
             
             return {
                 "features_shape": features.shape,
@@ -403,10 +1053,25 @@ class MedicalImagingAnalyzer:
 
 # Initialize global analyzer
 analyzer = None
+_analyzer_lock = threading.Lock()
+_ready = threading.Event()
 
 def get_analyzer():
     """Get or create the analyzer instance"""
     global analyzer
     if analyzer is None:
-        analyzer = MedicalImagingAnalyzer()
+        with _analyzer_lock:
+            if analyzer is None:
+                analyzer = MedicalImagingAnalyzer()
     return analyzer
+
+
+def warmup():
+    """Build the models and run a dummy forward pass, then mark the process ready"""
+    get_analyzer().warmup()
+    _ready.set()
+
+
+def is_ready():
+    """True once warmup() has finished in this process"""
+    return _ready.is_set()
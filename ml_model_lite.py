@@ -3,11 +3,84 @@ Lightweight Medical Imaging Analysis
 Uses PIL for image processing without heavy dependencies
 """
 
+import os
 import numpy as np
 from PIL import Image
 import warnings
+
+from image_io import open_image
+from metrics import timed
 warnings.filterwarnings('ignore')
 
+# Compute mean/std from PIL's 256-bin histogram instead of a full pixel array.
+# Exact (up to float rounding) for 8-bit images; other modes use the array path.
+FAST_STATS = os.getenv("LITE_FAST_STATS", "1") != "0"
+
+# Decode JPEGs at 1/N resolution via Image.draft (1 = off, else 2, 4 or 8).
+# The mean stays within about one gray level, but std drops on noisy or
+# high-detail images because the scaled decode averages neighboring pixels;
+# measure the drift with compare_fast_stats() before enabling it.
+JPEG_DRAFT_SCALE = int(os.getenv("LITE_JPEG_DRAFT_SCALE", "1"))
+
+# Modes whose histogram() has 256 bins per band that match np.asarray values
+HISTOGRAM_MODES = {"L", "P", "RGB", "RGBA", "LA"}
+
+_LEVELS = np.arange(256, dtype=np.float64)
+
+
+def image_statistics(source, fast=None):
+    """
+    Size and intensity statistics of an image across all pixels and channels
+
+    Args:
+        source: Path to the image file, or its bytes / a file-like object
+        fast: Use the histogram (and optional JPEG draft) path; defaults to FAST_STATS
+
+    Returns:
+        (width, height, mean, std) of the full-resolution image
+    """
+    if fast is None:
+        fast = FAST_STATS
+    with timed("lite_stats"):
+        return _image_statistics(source, fast)
+
+
+def _image_statistics(source, fast):
+    img = open_image(source)
+    width, height = img.size
+
+    if fast and img.format == "JPEG" and JPEG_DRAFT_SCALE > 1:
+        img.draft(img.mode, (max(1, width // JPEG_DRAFT_SCALE), max(1, height // JPEG_DRAFT_SCALE)))
+
+    if fast and img.mode in HISTOGRAM_MODES:
+        counts = np.asarray(img.histogram(), dtype=np.float64).reshape(-1, 256).sum(axis=0)
+        total = counts.sum()
+        mean = float(counts @ _LEVELS / total)
+        variance = float(counts @ (_LEVELS * _LEVELS) / total) - mean * mean
+        return width, height, mean, float(np.sqrt(max(variance, 0.0)))
+
+    img_array = np.asarray(img)
+    return width, height, float(img_array.mean()), float(img_array.std())
+
+
+def compare_fast_stats(sources):
+    """
+    Largest absolute difference between the fast and exact statistics
+
+    Args:
+        sources: Image paths (or bytes) to check
+
+    Returns:
+        dict: {"mean": max |fast - exact| mean, "std": max |fast - exact| std}
+    """
+    drift = {"mean": 0.0, "std": 0.0}
+    for source in sources:
+        _, _, fast_mean, fast_std = image_statistics(source, fast=True)
+        _, _, mean, std = image_statistics(source, fast=False)
+        drift["mean"] = max(drift["mean"], abs(fast_mean - mean))
+        drift["std"] = max(drift["std"], abs(fast_std - std))
+    return drift
+
 class MedicalImagingAnalyzer:
     """
     Lightweight medical image analyzer
@@ -21,18 +94,13 @@ class MedicalImagingAnalyzer:
     def analyze_image(self, image_path):
         """
         Analyze medical image and return findings
+        
+        Args:
+            image_path: Path to the image file, or its bytes / a file-like object
         """
         try:
-            # Open image
-            img = Image.open(image_path)
-            img_array = np.array(img)
-            
-            # Image properties
-            height, width = img_array.shape[:2]
-
-            # Calculate statistics (work across channels if present)
-            mean_intensity = float(np.mean(img_array))
-            std_intensity = float(np.std(img_array))
+            # Image properties and statistics (across channels if present)
+            width, height, mean_intensity, std_intensity = image_statistics(image_path)
             contrast = float(std_intensity / (mean_intensity + 1e-6))
             
             # Determine image type
@@ -58,6 +126,8 @@ class MedicalImagingAnalyzer:
             findings = {
                 "image_type": image_type,
                 "dimensions": f"{width}x{height} pixels",
+                "width_value": width,
+                "height_value": height,
                 # keep both programmatic numeric values and formatted strings
                 "mean_intensity": f"{mean_intensity:.2f}",
                 "mean_intensity_value": mean_intensity,
@@ -96,21 +166,85 @@ def get_analyzer():
     return MedicalImagingAnalyzer()
 
 
+def warmup():
+    """Nothing to load for the lite analyzer"""
+    get_analyzer()
+
+
+def is_ready():
+    """The lite analyzer is always ready"""
+    return True
+
+
+# Column order of the feature matrix used by train_model.py and the classifier
+FEATURE_NAMES = ("mean_intensity", "std_intensity", "contrast", "width", "height")
+
+# Bump when the feature computation changes so cached features are rebuilt
+FEATURE_VERSION = "1" if JPEG_DRAFT_SCALE <= 1 else f"1-draft{JPEG_DRAFT_SCALE}"
+
+
+def extract_features_batch(paths):
+    """Compute the classifier features for many images straight from pixel data.
+
+    Skips the report strings and recommendations built by analyze_image.
+
+    Args:
+        paths: Iterable of image paths, bytes or file-like objects
+
+    Returns:
+        np.ndarray: C-contiguous (N, 5) float32 matrix with columns FEATURE_NAMES
+    """
+    sources = list(paths)
+    features = np.empty((len(sources), len(FEATURE_NAMES)), dtype=np.float32)
+    for i, source in enumerate(sources):
+        try:
+            width, height, mean_intensity, std_intensity = image_statistics(source)
+        except Exception as e:
+            label = source if isinstance(source, (str, os.PathLike)) else f"#{i}"
+            raise RuntimeError(f"Could not read image {label}: {e}")
+        features[i] = (
+            mean_intensity,
+            std_intensity,
+            std_intensity / (mean_intensity + 1e-6),
+            width,
+            height,
+        )
+    return features
+
+
+def features_from_findings(findings_list):
+    """Classifier feature matrix from analyze_image results, without decoding again.
+
+    Args:
+        findings_list: Findings dicts (without "error") from analyze_image
+
+    Returns:
+        np.ndarray: (N, 5) float32 matrix with columns FEATURE_NAMES, equal to
+        extract_features_batch on the same images
+    """
+    return np.array([
+        (
+            findings["mean_intensity_value"],
+            findings["std_intensity_value"],
+            findings["contrast_value"],
+            findings["width_value"],
+            findings["height_value"],
+        )
+        for findings in findings_list
+    ], dtype=np.float32).reshape(-1, len(FEATURE_NAMES))
+
+
 def extract_features_for_ml(image_path):
     """Helper that returns a simple feature dict suitable for ML training/prediction.
 
+    Args:
+        image_path: Path to the image file, or its bytes / a file-like object
+
     Returns:
         dict: {"mean_intensity": float, "std_intensity": float, "contrast": float, "width": int, "height": int}
     """
-    analyzer = get_analyzer()
-    res = analyzer.analyze_image(image_path)
-    if res.get("error"):
-        raise RuntimeError(res["error"])
-
-    return {
-        "mean_intensity": float(res.get("mean_intensity_value", 0.0)),
-        "std_intensity": float(res.get("std_intensity_value", 0.0)),
-        "contrast": float(res.get("contrast_value", 0.0)),
-        "width": int(res.get("dimensions", "0x0").split("x")[0]) if "dimensions" in res else 0,
-        "height": int(res.get("dimensions", "0x0").split("x")[1].split()[0]) if "dimensions" in res else 0,
-    }
+    row = extract_features_batch([image_path])[0]
+    feats = {name: float(value) for name, value in zip(FEATURE_NAMES, row)}
+    feats["width"] = int(feats["width"])
+    feats["height"] = int(feats["height"])
+    return feats
@@ -0,0 +1,81 @@
+"""
+Process-level cache for joblib model artifacts
+Loads a model once and hot-reloads it when the file on disk changes
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Keeps a single loaded copy of a joblib artifact
+
+    Every get() does one os.stat(). The artifact is only re-hashed when its
+    mtime or size changes, and only unpickled again when the hash differs,
+    so touching the file without changing it costs one hash and no reload.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # (model, sha256) are swapped together so readers never mix versions
+        self._current = (None, None)
+        self._stat_key = None
+
+    @property
+    def sha256(self):
+        """Hash of the currently loaded artifact, or None"""
+        return self._current[1]
+
+    def get(self):
+        """
+        Return the current model, reloading it if the file changed
+
+        Returns:
+            (model, sha256) of the loaded artifact, or (None, None) when
+            the artifact does not exist
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None, None
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if stat_key == self._stat_key:
+            return self._current
+
+        with self._lock:
+            if stat_key != self._stat_key:
+                try:
+                    self._reload(stat_key)
+                except Exception:
+                    if self._current[0] is None:
+                        raise
+                    # Keep serving the previous model rather than failing
+                    # requests on a bad artifact; retry on the next change
+                    logging.exception(f"Failed to reload {self.path}, keeping previous model")
+                    self._stat_key = stat_key
+        return self._current
+
+    def _reload(self, stat_key):
+        sha256 = file_sha256(self.path)
+        if sha256 != self._current[1]:
+            import joblib
+
+            model = joblib.load(self.path)
+            # Swap in the new model only after it loaded successfully
+            self._current = (model, sha256)
+            logging.info(f"Loaded model {self.path} (sha256 {sha256[:12]})")
+        self._stat_key = stat_key
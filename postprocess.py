@@ -0,0 +1,63 @@
+"""
+Vectorized post-processing of model scores
+Works on whole (N, C) score arrays: top-k selection with argpartition,
+threshold masks and label lookups happen in NumPy, and per-image dicts
+are only built at the end, when the results are serialized.
+"""
+
+import numpy as np
+
+
+def top_k(scores, k):
+    """
+    The k highest scores of each row, highest first
+
+    Selected classes with equal scores are ordered by class index.
+
+    Args:
+        scores: (N, C) array
+        k: Classes to keep per row (capped at C)
+
+    Returns:
+        (indices, values): (N, k) class indices and their scores as float64
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if scores.ndim != 2:
+        raise ValueError(f"Expected an (N, C) score array, got shape {scores.shape}")
+    n, c = scores.shape
+    k = min(k, c)
+    if k < c:
+        indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(c), (n, c))
+    values = np.take_along_axis(scores, indices, axis=1)
+
+    # Only the k selected columns get sorted
+    order = np.lexsort((indices, -values), axis=1)
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(values, order, axis=1)
+
+
+def predictions(labels, indices, values, mask=None):
+    """
+    Per-image prediction lists from top_k output
+
+    Args:
+        labels: (C,) array of class names
+        indices, values: From top_k
+        mask: Optional (N, k) boolean array; False entries are dropped
+
+    Returns:
+        One list per row of {"class", "confidence" (percent), "score"} dicts
+    """
+    names = np.asarray(labels)[indices].tolist()
+    scores = values.tolist()
+    confidences = (values * 100).tolist()
+    keep = np.ones(values.shape, dtype=bool).tolist() if mask is None else mask.tolist()
+    return [
+        [
+            {"class": name, "confidence": confidence, "score": score}
+            for name, confidence, score, kept in zip(row_names, row_confidences, row_scores, row_keep)
+            if kept
+        ]
+        for row_names, row_confidences, row_scores, row_keep in zip(names, confidences, scores, keep)
+    ]
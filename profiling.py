@@ -0,0 +1,146 @@
+"""
+On-demand request profiling
+A sampled fraction of requests (or any request carrying the admin token and
+X-Profile: 1) runs under cProfile; the profile is written to a directory
+with a JSON summary so the slowest recent requests can be listed and
+downloaded.
+
+cProfile only sees the request thread. Work handed to other threads (the
+micro-batcher, the hedging executors, job workers) shows up as time spent
+waiting on it.
+"""
+
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def request_id_from(header_value):
+    """Use a caller-supplied X-Request-ID if it is safe as a file name, else a new one"""
+    if header_value and _REQUEST_ID.match(header_value):
+        return header_value
+    return uuid.uuid4().hex
+
+
+def admin_authorized(token, configured_token):
+    """Constant-time check of an admin token; always False when none is configured"""
+    return bool(configured_token) and bool(token) and hmac.compare_digest(token, configured_token)
+
+
+class ProfileStore:
+    """
+    Writes cProfile dumps plus a JSON summary per request, keeping the newest max_files
+
+    Args:
+        directory: Where .prof and .json files go
+        max_files: Profiles kept before the oldest are deleted
+        top_functions: Functions (by cumulative time) stored in each summary
+    """
+
+    def __init__(self, directory, max_files=200, top_functions=15):
+        self.directory = directory
+        self.max_files = max(1, int(max_files))
+        self.top_functions = top_functions
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start profiling the current thread; None if another profiler is active"""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process
+            return None
+        return profiler
+
+    def finish(self, profiler, request_id, info):
+        """
+        Stop profiler and save it with info (method, endpoint, status, duration_ms)
+
+        Returns:
+            The summary dict that was written
+        """
+        profiler.disable()
+        summary = dict(info, id=request_id, created_at=time.time(), top=self._top(profiler))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.directory, f"{request_id}.prof"))
+            self._write_json(os.path.join(self.directory, f"{request_id}.json"), summary)
+            self.prune()
+        except Exception as e:
+            logging.warning(f"Could not save profile {request_id}: {e}")
+        return summary
+
+    def _top(self, profiler):
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            rows.append({
+                "function": f"{os.path.basename(filename)}:{line}({function})",
+                "calls": calls,
+                "own_ms": own * 1000,
+                "cumulative_ms": cumulative * 1000,
+            })
+        rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+        return rows[:self.top_functions]
+
+    def _write_json(self, path, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+    def summaries(self):
+        """Every saved summary, unordered"""
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return summaries
+
+    def slowest(self, limit=20):
+        """Summaries of the slowest kept profiles, slowest first"""
+        summaries = sorted(self.summaries(), key=lambda s: s.get("duration_ms", 0), reverse=True)
+        return summaries[:limit]
+
+    def path_for(self, request_id):
+        """Path of a saved .prof file, or None"""
+        if not _REQUEST_ID.match(request_id):
+            return None
+        path = os.path.join(self.directory, f"{request_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def prune(self):
+        """Delete the oldest profiles beyond max_files"""
+        with self._lock:
+            summaries = sorted(self.summaries(), key=lambda s: s.get("created_at", 0))
+            for summary in summaries[:max(0, len(summaries) - self.max_files)]:
+                for ext in (".json", ".prof"):
+                    try:
+                        os.remove(os.path.join(self.directory, f"{summary['id']}{ext}"))
+                    except FileNotFoundError:
+                        pass
+
+
+def sampled(rate):
+    """True for roughly a `rate` fraction of calls"""
+    return rate > 0 and random.random() < rate
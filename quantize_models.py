@@ -0,0 +1,136 @@
+"""
+Convert the trained Keras models to quantized TensorFlow Lite artifacts and
+report how far the quantized scores drift from the Keras ones.
+
+Usage:
+    python quantize_models.py --calibration_dir uploads_demo --heldout_dir heldout --mode int8
+    ML_INFERENCE=tflite ML_TFLITE_QUANT=int8 python app.py
+
+For each of models/densenet_chexpert.h5 and models/mobilenet_mimic.h5 this
+writes models/<name>_<mode>.tflite and adds per-class score drift on the
+held-out images to the JSON report (default quantization_report.json).
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+from image_io import open_image
+from ml_model import CLASS_LABELS, MODEL_INPUT_SIZE, MODEL_PATHS, PREPROCESSORS, TFLitePredictor, tflite_path
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+
+
+def list_images(images_dir, limit=None):
+    paths = sorted(
+        os.path.join(images_dir, name) for name in os.listdir(images_dir)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+    return paths[:limit] if limit else paths
+
+
+def prepare(path, model_name):
+    img = open_image(path).convert('RGB').resize(MODEL_INPUT_SIZE)
+    batch = np.asarray(img, dtype='float32')[np.newaxis]
+    return PREPROCESSORS[model_name](batch)
+
+
+def convert(model, model_name, mode, calibration_paths):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        def representative_dataset():
+            for path in calibration_paths:
+                yield [prepare(path, model_name)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    return converter.convert()
+
+
+def drift_report(model, predictor, model_name, heldout_paths):
+    keras_scores, lite_scores = [], []
+    keras_ms, lite_ms = [], []
+    for path in heldout_paths:
+        batch = prepare(path, model_name)
+        start = time.perf_counter()
+        keras_scores.append(model(batch, training=False).numpy()[0])
+        keras_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        lite_scores.append(predictor(batch)[0])
+        lite_ms.append((time.perf_counter() - start) * 1000)
+
+    keras_scores = np.array(keras_scores)
+    lite_scores = np.array(lite_scores)
+    diff = lite_scores - keras_scores
+    labels = CLASS_LABELS.get(model_name)
+    if labels is None or len(labels) != keras_scores.shape[1]:
+        labels = [f"class_{i}" for i in range(keras_scores.shape[1])]
+
+    return {
+        "images": len(heldout_paths),
+        "top1_agreement": float(np.mean(keras_scores.argmax(axis=1) == lite_scores.argmax(axis=1))),
+        "max_abs_drift": float(np.abs(diff).max()),
+        "per_class": {
+            label: {
+                "mean_abs_drift": float(np.abs(diff[:, i]).mean()),
+                "max_abs_drift": float(np.abs(diff[:, i]).max()),
+                "mean_drift": float(diff[:, i].mean()),
+            }
+            for i, label in enumerate(labels)
+        },
+        "keras_ms_per_image": float(np.mean(keras_ms)),
+        "tflite_ms_per_image": float(np.mean(lite_ms)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calibration_dir', required=True, help='Representative images for int8 calibration')
+    parser.add_argument('--heldout_dir', required=True, help='Images used for the drift report')
+    parser.add_argument('--mode', choices=['int8', 'float16', 'both'], default='int8')
+    parser.add_argument('--num_calibration', type=int, default=200)
+    parser.add_argument('--report', default='quantization_report.json')
+    args = parser.parse_args()
+
+    calibration_paths = list_images(args.calibration_dir, args.num_calibration)
+    heldout_paths = list_images(args.heldout_dir)
+    if not calibration_paths or not heldout_paths:
+        print('Calibration and held-out directories must both contain images. Exiting.')
+        return
+
+    modes = ['int8', 'float16'] if args.mode == 'both' else [args.mode]
+    report = {}
+    for model_name, keras_path in MODEL_PATHS.items():
+        if not keras_path.exists():
+            print(f'Warning: {keras_path} not found, skipping {model_name}')
+            continue
+        model = tf.keras.models.load_model(str(keras_path))
+        report[model_name] = {"keras_path": str(keras_path), "keras_bytes": keras_path.stat().st_size}
+
+        for mode in modes:
+            out_path = tflite_path(model_name, mode)
+            print(f'Converting {keras_path} -> {out_path} ({mode})')
+            Path(out_path).write_bytes(convert(model, model_name, mode, calibration_paths))
+
+            predictor = TFLitePredictor(out_path)
+            stats = drift_report(model, predictor, model_name, heldout_paths)
+            stats["tflite_path"] = str(out_path)
+            stats["tflite_bytes"] = out_path.stat().st_size
+            report[model_name][mode] = stats
+            print(f'  top-1 agreement {stats["top1_agreement"]:.3f}, max drift {stats["max_abs_drift"]:.4f}, '
+                  f'{stats["keras_ms_per_image"]:.1f} ms -> {stats["tflite_ms_per_image"]:.1f} ms per image')
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote drift report to {args.report}')
+
+
+if __name__ == '__main__':
+    main()
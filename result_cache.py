@@ -0,0 +1,206 @@
+"""
+Content-addressed cache for analysis results
+Keys are the SHA-256 of the uploaded bytes plus the model/prompt version
+
+Retention: entries expire after ``ttl_seconds`` in both tiers, and the
+on-disk tier is pruned (expired entries first, then oldest) whenever it
+grows past ``disk_max_bytes``. Cached results describe patient images and
+are stored as plain JSON, so point ``disk_dir`` at storage with the same
+access controls as the uploads themselves.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import CACHE_LOOKUPS
+
+
+def make_key(data, *version_parts):
+    """
+    Build a cache key from upload bytes and version identifiers
+
+    Args:
+        data: Raw uploaded bytes
+        version_parts: Strings identifying the model, prompt, etc.
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    version = "|".join(str(part) for part in version_parts)
+    return hashlib.sha256(f"{digest}|{version}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier result cache
+
+    A bounded in-memory LRU per process, backed by an optional directory of
+    JSON files that all gunicorn workers on the host can share.
+    """
+
+    # Check the disk tier size after this many writes
+    PRUNE_EVERY = 64
+
+    def __init__(self, max_entries=256, disk_dir=None, ttl_seconds=86400, disk_max_bytes=512 * 1024 * 1024,
+                 name="result"):
+        """
+        Args:
+            max_entries: Size of the in-memory LRU (0 disables it)
+            disk_dir: Directory for the shared on-disk tier, or None
+            ttl_seconds: Lifetime of an entry in either tier (0 disables expiry)
+            disk_max_bytes: Size the on-disk tier is pruned back to
+            name: Label for this cache in the lookup metrics
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.disk_dir = disk_dir
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.disk_max_bytes = max(0, int(disk_max_bytes))
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self.prune()
+
+    def get(self, key):
+        """Return the cached result for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    CACHE_LOOKUPS.labels(self.name, "memory_hit").inc()
+                    return value
+                del self._entries[key]
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                CACHE_LOOKUPS.labels(self.name, "miss").inc()
+                return None
+            self.disk_hits += 1
+            CACHE_LOOKUPS.labels(self.name, "disk_hit").inc()
+            self._remember(key, value, now)
+        return value
+
+    def set(self, key, value):
+        """Store a JSON-serializable result under key"""
+        with self._lock:
+            self._remember(key, value, time.time())
+        self._write_disk(key, value)
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def prune(self):
+        """Delete expired disk entries, then the oldest until under disk_max_bytes"""
+        if not self.disk_dir:
+            return
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if self._expired(st.st_mtime, now):
+                    self._remove(path)
+                else:
+                    files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _expired(self, written_at, now):
+        return self.ttl_seconds > 0 and now - written_at > self.ttl_seconds
+
+    def _remember(self, key, value, now):
+        if self.max_entries == 0:
+            return
+        expires_at = now + self.ttl_seconds if self.ttl_seconds > 0 else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _read_disk(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if self._expired(os.stat(path).st_mtime, now):
+                self._remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so other workers never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Could not write cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self._writes_since_prune += 1
+            if self._writes_since_prune < self.PRUNE_EVERY:
+                return
+            self._writes_since_prune = 0
+        try:
+            self.prune()
+        except Exception as e:
+            logging.warning(f"Could not prune result cache: {e}")
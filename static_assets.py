@@ -0,0 +1,128 @@
+"""
+Manifest-driven serving of the React build
+The build directory is scanned once at startup: every file is read into
+memory with its content type, a strong ETag and, for text assets, gzip and
+brotli variants compressed ahead of time. Requests are then answered from
+the in-memory index without touching the filesystem.
+
+Files with a content hash in their name (static/js/main.1a2b3c4d.js) never
+change under the same URL and are served as immutable; everything else
+(index.html, manifest.json) must be revalidated, which the ETag makes cheap.
+"""
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+
+from flask import Response
+
+from compression import COMPRESSIBLE_TYPES, compress, supported_encodings
+
+# CRA and webpack put an 8+ character hex hash before the extension
+_HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?[A-Za-z0-9]+(?:\.map)?$")
+
+_EXTRA_COMPRESSIBLE = {
+    "application/javascript",
+    "text/javascript",
+    "text/css",
+    "image/svg+xml",
+    "application/manifest+json",
+    "image/x-icon",
+}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+class StaticAsset:
+    """One file of the build: its bytes, precompressed variants and headers"""
+
+    __slots__ = ("path", "mimetype", "cache_control", "variants")
+
+    def __init__(self, path, mimetype, cache_control, variants):
+        self.path = path
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        # encoding (None for identity) -> (bytes, etag)
+        self.variants = variants
+
+
+class StaticManifest:
+    """
+    In-memory index of a build directory
+
+    Args:
+        root: Directory to scan (a missing directory gives an empty manifest)
+        min_bytes: Files smaller than this are not precompressed
+        level: Compression level for the precompressed variants
+    """
+
+    def __init__(self, root, min_bytes=1024, level=9):
+        self.root = root
+        self.min_bytes = min_bytes
+        self.level = level
+        self.assets = {}
+        self.total_bytes = 0
+        if os.path.isdir(root):
+            self._scan()
+            logging.info(f"Static manifest: {len(self.assets)} files, {self.total_bytes} bytes from {root}")
+
+    def _scan(self):
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                full_path = os.path.join(directory, filename)
+                path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    data = f.read()
+                self.assets[path] = self._asset(path, data)
+
+    def _asset(self, path, data):
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        cache_control = IMMUTABLE_CACHE_CONTROL if _HASHED_NAME.search(path) else REVALIDATE_CACHE_CONTROL
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        variants = {None: (data, digest)}
+        self.total_bytes += len(data)
+
+        if len(data) >= self.min_bytes and (mimetype in COMPRESSIBLE_TYPES or mimetype in _EXTRA_COMPRESSIBLE):
+            for encoding in supported_encodings():
+                compressed = compress(data, encoding, self.level)
+                # Only worth keeping if it saves a meaningful amount
+                if len(compressed) < len(data) * 0.9:
+                    variants[encoding] = (compressed, f"{digest}-{encoding}")
+                    self.total_bytes += len(compressed)
+        return StaticAsset(path, mimetype, cache_control, variants)
+
+    def get(self, path):
+        """The asset at a build-relative path, or None"""
+        return self.assets.get(path)
+
+    def response(self, asset, accept_encodings, if_none_match):
+        """
+        Response for an asset: the best variant the client accepts, or 304
+
+        Args:
+            asset: StaticAsset from get()
+            accept_encodings: werkzeug Accept object (request.accept_encodings)
+            if_none_match: werkzeug ETags object (request.if_none_match)
+        """
+        encoding = None
+        for candidate in supported_encodings():
+            if candidate in asset.variants and accept_encodings[candidate] > 0:
+                encoding = candidate
+                break
+        body, etag = asset.variants[encoding]
+
+        headers = {"Cache-Control": asset.cache_control}
+        if len(asset.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+
+        if if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            if encoding is not None:
+                headers["Content-Encoding"] = encoding
+            response = Response(body, mimetype=asset.mimetype, headers=headers)
+        response.set_etag(etag)
+        return response
@@ -7,7 +7,7 @@ from groq import Groq
 # === CONFIGURATION ===
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 IMAGE_PATH = "image.jpg"
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "dicom"}
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "dicom", "dcm"}
 
 # === Medical Analysis Prompt ===
 MEDICAL_QUERY = """
@@ -57,7 +57,7 @@ def encode_image(image_path):
 
 def analyze_image(image_path, groq_api_key):
     if not allowed_file(image_path):
-        raise ValueError("Invalid file type. Allowed types: png, jpg, jpeg, dicom.")
+        raise ValueError("Invalid file type. Allowed types: png, jpg, jpeg, dicom, dcm.")
 
     base64_image = encode_image(image_path)
     client = Groq(api_key=groq_api_key)
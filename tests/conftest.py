@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Keep test imports of app.py from building models in the background
+os.environ.setdefault("ML_WARMUP", "0")
@@ -0,0 +1,107 @@
+import io
+import json
+import zipfile
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import app as app_module
+from result_cache import ResultCache
+
+
+class FakeBatchAnalyzer:
+    model_version = "fake"
+
+    def __init__(self):
+        self.batches = []
+
+    def ensemble_analysis_batch(self, sources, batch_size=16):
+        sources = list(sources)
+        self.batches.append(len(sources))
+        for index, data in enumerate(sources):
+            yield index, {"ensemble_confidence": 50.0, "size": len(data)}
+
+    def ensemble_analysis_frames(self, dicom, batch_size=16):
+        for index in range(dicom.frame_count):
+            yield index, {"ensemble_confidence": 60.0, "frame_mean": float(dicom.frame(index).mean())}
+
+
+def _png(seed):
+    buffer = io.BytesIO()
+    rng = np.random.default_rng(seed)
+    Image.fromarray(rng.integers(0, 256, (16, 16), dtype=np.uint8)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    analyzer = FakeBatchAnalyzer()
+    monkeypatch.setattr(app_module, "get_analyzer", lambda: analyzer)
+    monkeypatch.setattr(app_module, "result_cache", ResultCache(max_entries=16))
+    monkeypatch.setattr(app_module, "format_ml_analysis", lambda analysis: "<p>ok</p>")
+    monkeypatch.setattr(app_module, "BATCH_ANALYSIS_SIZE", 2)
+    app_module.app.config["TESTING"] = True
+    with app_module.app.test_client() as client:
+        client.analyzer = analyzer
+        yield client
+
+
+def _lines(response):
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_multipart_images_are_batched_and_streamed(client):
+    files = [(io.BytesIO(_png(i)), f"img{i}.png") for i in range(3)]
+    files.append((io.BytesIO(b"text"), "notes.txt"))
+    lines = _lines(client.post("/api/ml-analyze/batch", data={"images": files}))
+
+    assert lines[-1] == {"done": True, "count": 4, "errors": 1}
+    results = {line["index"]: line for line in lines[:-1]}
+    assert [results[i]["filename"] for i in range(4)] == ["img0.png", "img1.png", "img2.png", "notes.txt"]
+    assert "error" in results[3]
+    assert results[0]["result"] == "<p>ok</p>"
+    assert client.analyzer.batches == [2, 1]
+
+
+def test_zip_archive_and_cache_hits(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.png", _png(0))
+        zf.writestr("nested/b.png", _png(1))
+        zf.writestr("nested/", "")
+    payload = archive.getvalue()
+
+    first = _lines(client.post("/api/ml-analyze/batch", data={"images": (io.BytesIO(payload), "scans.zip")}))
+    assert [line["filename"] for line in first[:-1]] == ["a.png", "nested/b.png"]
+
+    # Both images are now cached, so no model batch runs the second time
+    second = _lines(client.post("/api/ml-analyze/batch", data={"images": (io.BytesIO(payload), "scans.zip")}))
+    assert second[:-1] == first[:-1]
+    assert client.analyzer.batches == [2]
+
+
+def test_failed_analyses_count_as_errors():
+    assert app_module.batch_line_failed({"analysis": {"densenet_result": {"error": "x"}}})
+    assert app_module.batch_line_failed({"analysis": {"error": "bad image"}, "model_info": None})
+    assert app_module.batch_line_failed({"analysis": {"image_type": "L"}, "model_info": {"error": "x"}})
+    assert not app_module.batch_line_failed({"analysis": {"image_type": "L"}, "model_info": None})
+    assert not app_module.batch_line_failed({"analysis": {"ensemble_confidence": 50.0}})
+
+
+def test_no_files_is_rejected(client):
+    assert client.post("/api/ml-analyze/batch").status_code == 400
+
+
+def test_multiframe_dicom_gives_one_line_per_frame(client, tmp_path):
+    pytest.importorskip("pydicom")
+    from test_dicom_io import _dicom
+
+    path, _ = _dicom(tmp_path / "study.dcm", frames=3)
+    with open(path, "rb") as f:
+        data = f.read()
+    lines = _lines(client.post("/api/ml-analyze/batch", data={"images": (io.BytesIO(data), "study.dcm")}))
+
+    assert [(line["frame"], line["frames"]) for line in lines[:-1]] == [(0, 3), (1, 3), (2, 3)]
+    assert lines[-1] == {"done": True, "count": 3, "errors": 0}
@@ -0,0 +1,80 @@
+import threading
+
+import numpy as np
+
+from batching import MicroBatcher
+
+
+def test_rows_are_routed_back_to_their_callers():
+    calls = []
+
+    def predict(batch):
+        calls.append(len(batch))
+        return batch * 10
+
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=50)
+    results = {}
+
+    def worker(i):
+        results[i] = batcher.predict(np.array([[i, i + 100]]))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for i in range(6):
+        assert results[i].tolist() == [[i * 10, (i + 100) * 10]]
+    assert sum(calls) == 6
+    assert max(calls) <= 4
+    assert len(calls) < 6
+
+
+def test_multi_row_submissions_get_their_own_slice():
+    batcher = MicroBatcher(lambda batch: batch + 1, max_batch_size=8, max_wait_ms=50)
+    first = batcher.submit(np.zeros((2, 1)))
+    second = batcher.submit(np.full((3, 1), 5.0))
+    assert first.result().tolist() == [[1.0], [1.0]]
+    assert second.result().tolist() == [[6.0], [6.0], [6.0]]
+
+
+def test_cancelled_requests_are_skipped():
+    release = threading.Event()
+    started = threading.Event()
+    calls = []
+
+    def predict(batch):
+        calls.append(batch.ravel().tolist())
+        started.set()
+        release.wait(5)
+        return batch
+
+    batcher = MicroBatcher(predict, max_batch_size=1, max_wait_ms=0)
+    blocker = batcher.submit(np.array([[0]]))
+    assert started.wait(5)
+
+    # Both wait in the queue while the worker is busy with the blocker
+    cancelled = batcher.submit(np.array([[1]]))
+    kept = batcher.submit(np.array([[2]]))
+    assert cancelled.cancel()
+    release.set()
+
+    assert blocker.result(5).tolist() == [[0]]
+    assert kept.result(5).tolist() == [[2]]
+    assert calls == [[0], [2]]
+
+
+def test_errors_propagate_to_every_caller():
+    def predict(batch):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=20)
+    futures = [batcher.submit(np.zeros((1, 1))) for _ in range(3)]
+    for future in futures:
+        try:
+            future.result(5)
+        except RuntimeError as e:
+            assert str(e) == "boom"
+        else:
+            raise AssertionError("expected RuntimeError")
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from benchmarks import suite
+from benchmarks.timing import summarize
+
+
+def test_summarize():
+    stats = summarize([1.0] * 98 + [10.0, 20.0])
+    assert stats["iterations"] == 100
+    assert stats["p50_ms"] == 1.0
+    assert stats["p99_ms"] > 10.0
+    assert stats["throughput_per_s"] == pytest.approx(100 / 0.128)
+
+
+def test_run_and_compare(tmp_path, monkeypatch):
+    monkeypatch.setenv("ML_BACKEND", "lite")
+    output = tmp_path / "bench.json"
+    argv = ["--stages", "lite", "format", "--sizes", "32", "--formats", "png", "jpeg",
+            "--demo-count", "0", "--iterations", "3", "--warmup", "1", "--output", str(output)]
+    assert suite.main(argv) == 0
+
+    current = json.loads(output.read_text())
+    assert set(current["results"]) == {"lite/png_32", "lite/jpeg_32", "format/fixed"}
+    assert {"p50_ms", "p95_ms", "p99_ms", "throughput_per_s"} <= set(current["results"]["lite/png_32"])
+
+    # A baseline twice as fast as the current run is a regression
+    baseline = json.loads(output.read_text())
+    for stats in baseline["results"].values():
+        stats["p50_ms"] /= 2
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(baseline))
+    assert suite.main(["--current", str(output), "--compare", str(baseline_path)]) == 1
+    assert suite.main(["--current", str(output), "--compare", str(output)]) == 0
+
+    # A stage that now crashes, or was dropped, fails the gate too
+    for broken in ({"lite/png_32": {"error": "boom"}}, {"lite/png_32": None}):
+        results = {key: stats for key, stats in {**current["results"], **broken}.items() if stats is not None}
+        broken_path = tmp_path / "broken.json"
+        broken_path.write_text(json.dumps(dict(current, results=results)))
+        assert suite.main(["--current", str(broken_path), "--compare", str(output)]) == 1
@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+ml_model = pytest.importorskip("ml_model")
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), (90, 90, 90)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Predictor:
+    """Returns fixed score rows and remembers the batch sizes it saw"""
+
+    def __init__(self, rows):
+        self.rows = np.asarray(rows, dtype=np.float32)
+        self.batch_sizes = []
+
+    def __call__(self, batch):
+        self.batch_sizes.append(len(batch))
+        return self.rows[:len(batch)]
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = object.__new__(ml_model.MedicalImagingAnalyzer)
+    mobilenet = np.full(len(ml_model.CLASS_LABELS["mobilenet"]), 0.1)
+    confident, uncertain = mobilenet.copy(), mobilenet.copy()
+    confident[0] = 0.95
+    uncertain[1] = 0.6
+    analyzer.predictors = {
+        "mobilenet": Predictor([confident, uncertain]),
+        "densenet": Predictor(np.full((2, len(ml_model.CLASS_LABELS["densenet"])), 0.5)),
+    }
+    analyzer.batchers = {}
+    analyzer.medical_classifier = None
+    analyzer.model_version = "test"
+    analyzer.cascade = True
+    analyzer.cascade_band = (30, 85)
+    analyzer.cascade_classifier = False
+    return analyzer
+
+
+def test_confident_mobilenet_skips_densenet(analyzer):
+    result = analyzer.ensemble_analysis(_png())
+    assert result["stages"] == ["mobilenet"]
+    assert "densenet_result" not in result
+    assert result["ensemble_confidence"] == pytest.approx(95)
+    assert analyzer.predictors["densenet"].batch_sizes == []
+    assert analyzer.analysis_mode == "cascade:30-85"
+
+
+def test_batch_escalates_only_uncertain_images(analyzer):
+    results = [result for _, result in analyzer.ensemble_analysis_batch([_png(), _png()])]
+    assert [r["stages"] for r in results] == [["mobilenet"], ["mobilenet", "densenet"]]
+    assert analyzer.predictors["densenet"].batch_sizes == [1]
+    assert results[1]["ensemble_confidence"] == pytest.approx((60 + 50) / 2)
+
+
+def test_full_ensemble_runs_both_models(analyzer):
+    analyzer.cascade = False
+    result = analyzer.ensemble_analysis(_png())
+    assert result["stages"] == ["densenet", "mobilenet"]
+    assert analyzer.analysis_mode == "ensemble"
+
+
+def test_classifier_weights_are_part_of_the_model_version(analyzer):
+    analyzer.model_sources = {"densenet": "file:a", "mobilenet": "file:b", "classifier": "untrained:1"}
+    base = analyzer._compute_model_version()
+
+    analyzer.cascade_classifier = True
+    with_classifier = analyzer._compute_model_version()
+    analyzer.model_sources["classifier"] = "untrained:2"
+    assert len({base, with_classifier, analyzer._compute_model_version()}) == 3
+
+
+def test_every_dicom_frame_is_analyzed(analyzer, tmp_path):
+    pytest.importorskip("pydicom")
+    from dicom_io import read_dicom
+    from test_dicom_io import _dicom
+
+    analyzer.cascade = False
+    path, _ = _dicom(tmp_path / "study.dcm", frames=3)
+    results = list(analyzer.ensemble_analysis_frames(read_dicom(path), batch_size=2))
+    assert [index for index, _ in results] == [0, 1, 2]
+    assert all(result["stages"] == ["densenet", "mobilenet"] for _, result in results)
+    assert analyzer.predictors["mobilenet"].batch_sizes == [2, 1]
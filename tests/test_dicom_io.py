@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+pydicom = pytest.importorskip("pydicom")
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, ImplicitVRLittleEndian, generate_uid
+
+from dicom_io import is_dicom, read_dicom
+from image_io import open_image
+from ml_model_lite import MedicalImagingAnalyzer
+
+
+def _dicom(path, frames=1, syntax=ExplicitVRLittleEndian, window=(40, 400), photometric="MONOCHROME2"):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 3000, size=(frames, 32, 24)).astype(np.uint16)
+
+    meta = FileMetaDataset()
+    meta.TransferSyntaxUID = syntax
+    meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.Rows, ds.Columns = 32, 24
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = photometric
+    ds.BitsAllocated = ds.BitsStored = 16
+    ds.HighBit = 15
+    ds.PixelRepresentation = 0
+    if frames > 1:
+        ds.NumberOfFrames = frames
+    ds.RescaleSlope = 1
+    ds.RescaleIntercept = -1024
+    if window:
+        ds.WindowCenter, ds.WindowWidth = window
+    ds.PixelData = pixels.tobytes()
+    if int(pydicom.__version__.split(".")[0]) >= 3:
+        pydicom.dcmwrite(str(path), ds, enforce_file_format=True)
+    else:
+        ds.is_little_endian = True
+        ds.is_implicit_VR = syntax == ImplicitVRLittleEndian
+        pydicom.dcmwrite(str(path), ds, write_like_original=False)
+    return str(path), pixels
+
+
+def _expected_window(pixels, center=40, width=400):
+    hu = pixels.astype(np.float64) - 1024
+    low = center - 0.5 - (width - 1) / 2
+    return np.clip((hu - low) * 255.0 / (width - 1), 0, 255)
+
+
+@pytest.mark.parametrize("syntax", [ExplicitVRLittleEndian, ImplicitVRLittleEndian])
+def test_pixels_are_mapped_not_copied(tmp_path, syntax):
+    path, pixels = _dicom(tmp_path / "a.dcm", frames=3, syntax=syntax)
+    assert is_dicom(path)
+
+    from_file = read_dicom(path)
+    assert isinstance(from_file.pixels, np.memmap)
+    np.testing.assert_array_equal(from_file.pixels, pixels)
+
+    with open(path, "rb") as f:
+        from_bytes = read_dicom(f.read())
+    assert not from_bytes.pixels.flags["OWNDATA"]
+    np.testing.assert_array_equal(from_bytes.pixels, pixels)
+
+
+def test_frames_are_rescaled_and_windowed(tmp_path):
+    path, pixels = _dicom(tmp_path / "a.dcm", frames=2)
+    frames = list(read_dicom(path).iter_frames())
+    assert len(frames) == 2
+    for frame, raw in zip(frames, pixels):
+        assert frame.dtype == np.float32
+        np.testing.assert_allclose(frame, _expected_window(raw), atol=1e-3)
+
+
+def test_monochrome1_is_inverted(tmp_path):
+    path, pixels = _dicom(tmp_path / "a.dcm", photometric="MONOCHROME1")
+    np.testing.assert_allclose(read_dicom(path).frame(), 255 - _expected_window(pixels[0]), atol=1e-3)
+
+
+def test_missing_window_uses_frame_range(tmp_path):
+    path, _ = _dicom(tmp_path / "a.dcm", window=None)
+    frame = read_dicom(path).frame()
+    assert frame.min() == 0 and frame.max() == pytest.approx(255)
+
+
+def test_model_input_shape(tmp_path):
+    path, _ = _dicom(tmp_path / "a.dcm")
+    tensor = read_dicom(path).model_input(0, (224, 224))
+    assert tensor.shape == (224, 224, 3)
+    assert tensor.dtype == np.float32
+
+
+def test_open_image_and_lite_analyzer_accept_dicom(tmp_path):
+    path, _ = _dicom(tmp_path / "a.dcm")
+    img = open_image(path)
+    assert img.mode == "L" and img.size == (24, 32)
+    with open(path, "rb") as f:
+        findings = MedicalImagingAnalyzer().analyze_image(f.read())
+    assert "error" not in findings
+    assert findings["dimensions"] == "24x32 pixels"
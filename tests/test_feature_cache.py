@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+import feature_cache
+from feature_cache import featurize
+from ml_model_lite import extract_features_batch
+
+
+def _write_images(directory, count):
+    paths = []
+    for i in range(count):
+        path = directory / f"img_{i}.png"
+        Image.fromarray(np.full((8 + i, 10), 20 * i, dtype=np.uint8)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_features_match_direct_extraction(tmp_path):
+    paths = _write_images(tmp_path, 5)
+    features, ok = featurize(paths, workers=2, chunk_size=2, cache_path=str(tmp_path / "cache.npz"))
+    assert ok.all()
+    np.testing.assert_array_equal(features, extract_features_batch(paths))
+
+
+def test_only_changed_images_are_refeaturized(tmp_path, monkeypatch):
+    paths = _write_images(tmp_path, 4)
+    cache_path = str(tmp_path / "cache.npz")
+    featurize(paths, workers=1, cache_path=cache_path)
+
+    seen = []
+    real_chunk = feature_cache._featurize_chunk
+    monkeypatch.setattr(feature_cache, "_featurize_chunk", lambda chunk: seen.extend(chunk) or real_chunk(chunk))
+
+    featurize(paths, workers=1, cache_path=cache_path)
+    assert seen == []
+
+    Image.fromarray(np.full((30, 30), 200, dtype=np.uint8)).save(paths[2])
+    st = os.stat(paths[2])
+    os.utime(paths[2], ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    features, _ = featurize(paths, workers=1, cache_path=cache_path)
+    assert seen == [paths[2]]
+    assert features[2][3] == 30
+
+
+def test_feature_version_change_discards_cache(tmp_path, monkeypatch):
+    paths = _write_images(tmp_path, 2)
+    cache_path = str(tmp_path / "cache.npz")
+    featurize(paths, workers=1, cache_path=cache_path)
+
+    monkeypatch.setattr(feature_cache, "FEATURE_VERSION", "test-next")
+    seen = []
+    real_chunk = feature_cache._featurize_chunk
+    monkeypatch.setattr(feature_cache, "_featurize_chunk", lambda chunk: seen.extend(chunk) or real_chunk(chunk))
+    featurize(paths, workers=1, cache_path=cache_path)
+    assert seen == paths
+
+
+def test_unreadable_images_are_masked(tmp_path):
+    paths = _write_images(tmp_path, 2)
+    bad = tmp_path / "bad.png"
+    bad.write_bytes(b"nope")
+    features, ok = featurize(paths + [str(bad)], workers=1, cache_path=str(tmp_path / "cache.npz"))
+    assert ok.tolist() == [True, True, False]
+
+
+def test_hash_mode_rehashes_only_touched_files(tmp_path, monkeypatch):
+    paths = _write_images(tmp_path, 3)
+    cache_path = str(tmp_path / "cache.npz")
+    features, ok = featurize(paths, workers=2, chunk_size=1, cache_path=cache_path, use_hash=True)
+    assert ok.all()
+    np.testing.assert_array_equal(features, extract_features_batch(paths))
+
+    hashed = []
+    real_chunk = feature_cache._hash_and_featurize_chunk
+
+    def recording_chunk(chunk, cached_hashes):
+        result = real_chunk(chunk, cached_hashes)
+        hashed.extend(zip(chunk, result[2].tolist()))
+        return result
+
+    monkeypatch.setattr(feature_cache, "_hash_and_featurize_chunk", recording_chunk)
+
+    # Unchanged size/mtime: nothing is read again
+    featurize(paths, workers=1, cache_path=cache_path, use_hash=True)
+    assert hashed == []
+
+    # Touched but identical: hashed, not refeaturized, and its new stat is remembered
+    st = os.stat(paths[1])
+    os.utime(paths[1], ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    features, _ = featurize(paths, workers=1, cache_path=cache_path, use_hash=True)
+    assert hashed == [(paths[1], False)]
+    np.testing.assert_array_equal(features, extract_features_batch(paths))
+    featurize(paths, workers=1, cache_path=cache_path, use_hash=True)
+    assert hashed == [(paths[1], False)]
@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def hedge(monkeypatch):
+    monkeypatch.setattr(app_module, "GROQ_LATENCY_BUDGET_MS", 100)
+
+    def configure(groq, ml):
+        monkeypatch.setattr(app_module, "run_groq_analysis", groq)
+        monkeypatch.setattr(app_module, "run_ml_analysis", ml)
+        return app_module.run_hedged_analysis(b"image")
+
+    return configure
+
+
+def _after(delay, result=None, error=None):
+    def run(data, **kwargs):
+        time.sleep(delay)
+        if error is not None:
+            raise RuntimeError(error)
+        return result
+
+    return run
+
+
+def test_groq_within_budget_wins(hedge):
+    assert hedge(_after(0.01, {"src": "groq"}), _after(0.05, {"src": "ml"})) == {"src": "groq"}
+
+
+def test_ml_wins_when_groq_is_slow(hedge):
+    assert hedge(_after(1.0, {"src": "groq"}), _after(0.01, {"src": "ml"})) == {"src": "ml"}
+
+
+def test_groq_failure_falls_back_to_ml(hedge):
+    assert hedge(_after(0.01, error="groq boom"), _after(0.05, {"src": "ml"})) == {"src": "ml"}
+
+
+def test_ml_failure_waits_for_slow_groq(hedge):
+    assert hedge(_after(0.5, {"src": "groq"}), _after(0.01, error="ml boom")) == {"src": "groq"}
+
+
+def test_raises_only_when_both_fail(hedge):
+    with pytest.raises(RuntimeError):
+        hedge(_after(0.2, error="groq boom"), _after(0.01, error="ml boom"))
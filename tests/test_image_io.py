@@ -0,0 +1,30 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from image_io import open_image
+from ml_model_lite import MedicalImagingAnalyzer, extract_features_for_ml
+
+
+def _png_bytes(width=40, height=30, value=120):
+    buf = io.BytesIO()
+    Image.fromarray(np.full((height, width), value, dtype="uint8")).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_open_image_accepts_bytes_and_memoryview():
+    data = _png_bytes()
+    assert open_image(data).size == (40, 30)
+    assert open_image(memoryview(data)).size == (40, 30)
+
+
+def test_stream_can_be_decoded_twice():
+    stream = io.BytesIO(_png_bytes())
+    findings = MedicalImagingAnalyzer().analyze_image(stream)
+    assert "error" not in findings
+
+    feats = extract_features_for_ml(stream)
+    assert feats["width"] == 40
+    assert feats["height"] == 30
+    assert feats["mean_intensity"] == 120.0
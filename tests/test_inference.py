@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+ml_model = pytest.importorskip("ml_model")
+tf = ml_model.tf
+
+
+def _tiny_model(input_shape=(8, 8, 3), seed=0):
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input(input_shape)
+    x = tf.keras.layers.Conv2D(2, 3, strides=4, activation="relu")(inputs)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    x = tf.keras.layers.Dense(4, activation="relu")(x)
+    outputs = tf.keras.layers.Dense(3, activation="sigmoid")(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+def _batch(n, shape=(8, 8, 3)):
+    return np.random.default_rng(n).random((n,) + shape).astype(np.float32)
+
+
+def test_compiled_predictor_pads_and_chunks():
+    model = _tiny_model()
+    predictor = ml_model.CompiledPredictor(model)
+
+    for n, buckets in ((1, {1}), (3, {1, 4}), (37, {1, 4, 8, 32})):
+        batch = _batch(n)
+        scores = predictor(batch)
+        assert scores.shape == (n, 3)
+        np.testing.assert_allclose(scores, model.predict(batch, verbose=0), rtol=1e-5, atol=1e-6)
+        assert set(predictor._concrete) == buckets
+
+    # Same bucket sizes again: no new traces
+    traced = dict(predictor._concrete)
+    tracing_count = predictor._forward.experimental_get_tracing_count()
+    predictor(_batch(4))
+    predictor(_batch(40))
+    assert predictor._concrete == traced
+    assert predictor._forward.experimental_get_tracing_count() == tracing_count
+
+
+def test_tflite_predictor_resizes_between_batch_sizes(tmp_path):
+    model = _tiny_model()
+    path = tmp_path / "tiny.tflite"
+    try:
+        path.write_bytes(tf.lite.TFLiteConverter.from_keras_model(model).convert())
+    except Exception as e:
+        pytest.skip(f"TFLite conversion unavailable: {e}")
+    predictor = ml_model.TFLitePredictor(path)
+
+    for n in (1, 3, 1):
+        batch = _batch(n)
+        scores = predictor(batch)
+        assert scores.shape == (n, 3)
+        np.testing.assert_allclose(scores, model.predict(batch, verbose=0), rtol=1e-4, atol=1e-5)
+
+
+def test_extract_embeddings_mixes_paths_and_arrays(tmp_path):
+    analyzer = object.__new__(ml_model.MedicalImagingAnalyzer)
+    analyzer.densenet_model = _tiny_model(ml_model.MODEL_INPUT_SIZE[::-1] + (3,))
+    analyzer._feature_model = None
+    analyzer._feature_model_lock = ml_model.threading.Lock()
+
+    pixels = np.random.default_rng(0).integers(0, 256, (60, 50, 3), dtype=np.uint8)
+    path = tmp_path / "scan.png"
+    Image.fromarray(pixels).save(path)
+    decoded = analyzer.load_image(str(path))
+
+    embeddings = analyzer.extract_embeddings([str(path), decoded, pixels[..., 0]], batch_size=2)
+    assert embeddings.shape == (3, 4)
+    assert embeddings.dtype == np.float32
+    # A path and its decoded pixels give the same embedding
+    np.testing.assert_allclose(embeddings[0], embeddings[1], rtol=1e-5, atol=1e-6)
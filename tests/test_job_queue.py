@@ -0,0 +1,90 @@
+import io
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from job_queue import DONE, EXPIRED, FAILED, JobQueue, MemoryJobStore, QueueFull, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore()
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def _wait(queue, job_id, timeout=5):
+    # Poll the store directly: queue.get() hides finished jobs once they
+    # pass result_ttl, which a slow poll could otherwise miss
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.store.get(job_id)
+        if job is not None and job["status"] in (DONE, FAILED, EXPIRED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_result_and_failure(store):
+    queue = JobQueue(store, workers=2)
+    ok = queue.submit("test", lambda x: {"doubled": x * 2}, 21)
+    bad = queue.submit("test", lambda: 1 / 0)
+
+    job = _wait(queue, ok)
+    assert job["status"] == DONE and job["result"] == {"doubled": 42}
+    assert job["started_at"] <= job["finished_at"]
+    job = _wait(queue, bad)
+    assert job["status"] == FAILED and "division" in job["error"]
+    assert queue.pending() == 0
+
+
+def test_pending_bound_and_queue_ttl(store):
+    release = threading.Event()
+    queue = JobQueue(store, workers=1, max_pending=2, job_ttl=0.05)
+    first = queue.submit("test", lambda: release.wait(5) and {"ok": True})
+    second = queue.submit("test", lambda: {"ran": True})
+    with pytest.raises(QueueFull):
+        queue.submit("test", lambda: None)
+
+    # The second job waits past job_ttl behind the first, so it never runs
+    time.sleep(0.1)
+    release.set()
+    assert _wait(queue, first)["status"] == DONE
+    assert _wait(queue, second)["status"] == EXPIRED
+
+
+def test_results_are_dropped_after_retention(store):
+    queue = JobQueue(store, workers=1, result_ttl=0.05)
+    job_id = queue.submit("test", lambda: {"ok": True})
+    _wait(queue, job_id)
+    time.sleep(0.1)
+    assert queue.get(job_id) is None
+    assert queue.prune() == 1
+    assert store.get(job_id) is None
+
+
+def test_jobs_api(monkeypatch):
+    monkeypatch.setattr(app_module, "job_queue", JobQueue(MemoryJobStore()))
+    monkeypatch.setattr(app_module, "run_analysis", lambda data, html=True: {"result": "<p>ok</p>", "size": len(data)})
+    app_module.app.config["TESTING"] = True
+    client = app_module.app.test_client()
+
+    response = client.post("/api/jobs", data={"image": (io.BytesIO(b"pixels"), "scan.png")})
+    assert response.status_code == 202
+    job_id = response.get_json()["id"]
+    assert response.headers["Location"] == f"/api/jobs/{job_id}"
+
+    deadline = time.monotonic() + 5
+    while True:
+        body = client.get(f"/api/jobs/{job_id}").get_json()
+        if body["status"] == DONE or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    assert body["result"] == {"result": "<p>ok</p>", "size": 6}
+    assert body["mode"] == "analyze"
+
+    assert client.get("/api/jobs/missing").status_code == 404
+    bad_mode = client.post("/api/jobs", data={"image": (io.BytesIO(b"x"), "scan.png"), "mode": "nope"})
+    assert bad_mode.status_code == 400
@@ -0,0 +1,54 @@
+import re
+
+import pytest
+
+import app as app_module
+import metrics
+
+pytestmark = pytest.mark.skipif(not metrics.available(), reason="prometheus_client not installed")
+
+
+def _sample(text, name, **labels):
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(selector)}\}} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def _scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    return response.get_data(as_text=True)
+
+
+def test_metrics_endpoint_counts_requests_and_stages():
+    client = app_module.app.test_client()
+    before = _scrape(client)
+    with metrics.timed("decode"):
+        pass
+    client.get("/health")
+    after = _scrape(client)
+
+    name = "mediscan_request_duration_seconds_count"
+    labels = {"endpoint": "/health", "method": "GET", "status": "200"}
+    assert _sample(after, name, **labels) == _sample(before, name, **labels) + 1
+    stage = "mediscan_stage_duration_seconds_count"
+    assert _sample(after, stage, stage="decode") == _sample(before, stage, stage="decode") + 1
+
+
+def test_groq_failure_counts_a_fallback(monkeypatch):
+    monkeypatch.setattr(app_module, "ENV_GROQ_API_KEY", "test")
+    monkeypatch.setattr(app_module, "GROQ_HEDGE", False)
+    monkeypatch.setattr(app_module, "groq_available", lambda: True)
+
+    def broken_groq(data):
+        raise RuntimeError("groq down")
+
+    monkeypatch.setattr(app_module, "run_groq_analysis", broken_groq)
+    monkeypatch.setattr(app_module, "run_ml_analysis", lambda data, html=True: {"result": "ml"})
+    client = app_module.app.test_client()
+
+    name = "mediscan_fallbacks_total"
+    before = _sample(_scrape(client), name, source="groq", target="ml")
+    assert app_module.run_analysis(b"image") == {"result": "ml"}
+    assert _sample(_scrape(client), name, source="groq", target="ml") == before + 1
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ml_backend
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def fresh_backend(monkeypatch):
+    monkeypatch.setattr(ml_backend, "_module", None)
+    monkeypatch.setattr(ml_backend, "_built", False)
+    monkeypatch.setattr(ml_backend, "_ready_when_built", False)
+    return monkeypatch
+
+
+def test_lite_backend_is_selected_by_config(fresh_backend):
+    fresh_backend.setattr(ml_backend, "ML_BACKEND", "lite")
+    assert not ml_backend.is_loaded()
+    assert not ml_backend.is_ready()
+    assert ml_backend.load_backend().__name__ == "ml_model_lite"
+    ml_backend.warmup()
+    assert ml_backend.is_ready()
+
+
+def test_lazy_backend_is_ready_once_built(fresh_backend):
+    module = type("Backend", (), {"get_analyzer": staticmethod(object), "is_ready": staticmethod(lambda: False)})
+    fresh_backend.setattr(ml_backend, "_module", module)
+    assert not ml_backend.is_ready()
+
+    ml_backend.ready_when_built()
+    assert not ml_backend.is_ready()
+    ml_backend.get_analyzer()
+    assert ml_backend.is_ready()
+
+
+def test_unknown_backend_is_rejected(fresh_backend):
+    fresh_backend.setattr(ml_backend, "ML_BACKEND", "gpu")
+    with pytest.raises(ValueError):
+        ml_backend.load_backend()
+
+
+def test_importing_app_does_not_load_heavy_modules():
+    code = (
+        "import sys, app; "
+        "heavy = [m for m in ('tensorflow', 'cv2', 'groq', 'markdown', 'joblib', 'ml_model') if m in sys.modules]; "
+        "print(','.join(heavy))"
+    )
+    env = dict(os.environ, ML_WARMUP="0")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
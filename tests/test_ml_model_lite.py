@@ -0,0 +1,82 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ml_model_lite import (
+    FEATURE_NAMES,
+    MedicalImagingAnalyzer,
+    compare_fast_stats,
+    extract_features_batch,
+    features_from_findings,
+    image_statistics,
+)
+
+
+def _png(path, width, height, seed, mode="L"):
+    rng = np.random.default_rng(seed)
+    shape = (height, width) if mode == "L" else (height, width, 3)
+    Image.fromarray(rng.integers(0, 256, size=shape, dtype=np.uint8), mode=mode).save(path)
+    return str(path)
+
+
+def test_batch_matches_analyze_image(tmp_path):
+    paths = [
+        _png(tmp_path / "a.png", 64, 48, 0),
+        _png(tmp_path / "b.png", 30, 90, 1, mode="RGB"),
+    ]
+    features = extract_features_batch(paths)
+    assert features.shape == (2, len(FEATURE_NAMES))
+    assert features.dtype == np.float32
+    assert features.flags["C_CONTIGUOUS"]
+
+    analyzer = MedicalImagingAnalyzer()
+    for row, path in zip(features, paths):
+        findings = analyzer.analyze_image(path)
+        width, height = (int(v) for v in findings["dimensions"].split()[0].split("x"))
+        expected = [
+            findings["mean_intensity_value"],
+            findings["std_intensity_value"],
+            findings["contrast_value"],
+            width,
+            height,
+        ]
+        np.testing.assert_allclose(row, expected, rtol=1e-5)
+
+    # The request path builds the same rows from the findings alone
+    findings = [analyzer.analyze_image(path) for path in paths]
+    np.testing.assert_array_equal(features_from_findings(findings), features)
+
+
+def test_batch_accepts_buffers(tmp_path):
+    path = _png(tmp_path / "a.png", 20, 10, 2)
+    data = open(path, "rb").read()
+    features = extract_features_batch([path, data, io.BytesIO(data)])
+    assert np.array_equal(features[0], features[1])
+    assert np.array_equal(features[0], features[2])
+
+
+def test_unreadable_image_raises(tmp_path):
+    bad = tmp_path / "bad.png"
+    bad.write_bytes(b"not an image")
+    with pytest.raises(RuntimeError):
+        extract_features_batch([str(bad)])
+
+
+@pytest.mark.parametrize("mode", ["L", "RGB"])
+def test_fast_stats_match_exact(tmp_path, mode):
+    path = _png(tmp_path / "x.png", 120, 80, 7, mode=mode)
+    drift = compare_fast_stats([path])
+    assert drift["mean"] < 1e-6
+    assert drift["std"] < 1e-6
+
+
+def test_fast_stats_fall_back_for_16_bit(tmp_path):
+    path = str(tmp_path / "deep.png")
+    values = np.arange(0, 60000, 25, dtype=np.uint16).reshape(40, 60)
+    Image.fromarray(values).save(path)
+    width, height, mean, std = image_statistics(path, fast=True)
+    assert (width, height) == (60, 40)
+    assert mean == pytest.approx(float(values.mean()))
+    assert std == pytest.approx(float(values.std()))
@@ -0,0 +1,67 @@
+import os
+
+import joblib
+import pytest
+
+from model_registry import ModelRegistry
+
+
+def _bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_missing_artifact_returns_none(tmp_path):
+    registry = ModelRegistry(tmp_path / "model.joblib")
+    assert registry.get() == (None, None)
+
+
+def test_loads_once_and_reloads_on_hash_change(tmp_path, monkeypatch):
+    path = tmp_path / "model.joblib"
+    joblib.dump({"version": 1}, path)
+    registry = ModelRegistry(path)
+
+    loads = []
+    real_load = joblib.load
+    monkeypatch.setattr("joblib.load", lambda p: loads.append(p) or real_load(p))
+
+    model, sha256 = registry.get()
+    assert model == {"version": 1}
+    assert registry.get() == (model, sha256)
+    assert len(loads) == 1
+
+    joblib.dump({"version": 2}, path)
+    _bump_mtime(path)
+    model2, sha256_2 = registry.get()
+    assert model2 == {"version": 2}
+    assert sha256_2 != sha256
+    assert len(loads) == 2
+
+
+def test_touch_without_content_change_does_not_reload(tmp_path, monkeypatch):
+    path = tmp_path / "model.joblib"
+    joblib.dump({"version": 1}, path)
+    registry = ModelRegistry(path)
+    first = registry.get()
+
+    monkeypatch.setattr("joblib.load", lambda p: pytest.fail("unexpected reload"))
+    _bump_mtime(path)
+    assert registry.get() == first
+
+
+def test_bad_artifact_keeps_previous_model(tmp_path):
+    path = tmp_path / "model.joblib"
+    joblib.dump({"version": 1}, path)
+    registry = ModelRegistry(path)
+    first = registry.get()
+
+    path.write_bytes(b"not a pickle")
+    _bump_mtime(path)
+    assert registry.get() == first
+
+
+def test_bad_artifact_without_previous_model_raises(tmp_path):
+    path = tmp_path / "model.joblib"
+    path.write_bytes(b"not a pickle")
+    with pytest.raises(Exception):
+        ModelRegistry(path).get()
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from postprocess import predictions, top_k
+
+
+def test_top_k_matches_a_full_sort():
+    scores = np.random.default_rng(0).random((64, 14)).astype(np.float32)
+    indices, values = top_k(scores, 5)
+
+    expected = np.argsort(-scores, axis=1, kind="stable")[:, :5]
+    np.testing.assert_array_equal(indices, expected)
+    np.testing.assert_array_equal(values, np.take_along_axis(scores, expected, axis=1).astype(np.float64))
+
+
+def test_k_larger_than_classes_keeps_every_class():
+    indices, values = top_k([[0.2, 0.9, 0.2]], 5)
+    assert indices.tolist() == [[1, 0, 2]]
+    assert values.shape == (1, 3)
+
+
+def test_predictions_apply_labels_and_mask():
+    scores = np.array([[0.1, 0.8, 0.4], [0.05, 0.2, 0.25]], dtype=np.float32)
+    indices, values = top_k(scores, 2)
+    rows = predictions(np.array(["a", "b", "c"]), indices, values, values * 100 > 30)
+
+    assert [[p["class"] for p in row] for row in rows] == [["b", "c"], []]
+    assert rows[0][0] == {"class": "b", "confidence": float(scores[0, 1]) * 100, "score": float(scores[0, 1])}
+
+
+def test_rejects_single_rows():
+    with pytest.raises(ValueError):
+        top_k(np.zeros(3), 2)
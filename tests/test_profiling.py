@@ -0,0 +1,67 @@
+import io
+import pstats
+
+import pytest
+
+import app as app_module
+from profiling import ProfileStore, admin_authorized, request_id_from
+
+
+def test_request_ids_are_sanitized():
+    assert request_id_from("abc-123_X") == "abc-123_X"
+    generated = request_id_from("../../etc/passwd")
+    assert len(generated) == 32 and "/" not in generated
+
+
+def test_admin_token_check():
+    assert admin_authorized("secret", "secret")
+    assert not admin_authorized("wrong", "secret")
+    assert not admin_authorized("", "")
+
+
+def test_store_keeps_newest_and_lists_slowest(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=2)
+    for i, duration in enumerate([5.0, 50.0, 20.0]):
+        profiler = store.start()
+        sum(range(1000))
+        store.finish(profiler, f"req{i}", {"endpoint": "/x", "duration_ms": duration})
+
+    # req0 was the oldest and got pruned
+    assert [s["id"] for s in store.slowest()] == ["req1", "req2"]
+    assert store.slowest()[0]["top"]
+    pstats.Stats(store.path_for("req1"))
+    assert store.path_for("req0") is None
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "profile_store", ProfileStore(str(tmp_path)))
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(app_module, "run_ml_analysis", lambda data, html=True: {"result": "ok"})
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
+
+
+def _post(client, **headers):
+    return client.post("/api/ml-analyze", data={"image": (io.BytesIO(b"x"), "scan.png")}, headers=headers)
+
+
+def test_admin_header_forces_a_profile(client):
+    assert "X-Profile-Id" not in _post(client, **{"X-Profile": "1"}).headers
+
+    response = _post(client, **{"X-Profile": "1", "X-Admin-Token": "secret", "X-Request-ID": "slow-one"})
+    assert response.headers["X-Profile-Id"] == "slow-one"
+
+    assert client.get("/admin/profiles").status_code == 404
+    listing = client.get("/admin/profiles", headers={"X-Admin-Token": "secret"}).get_json()
+    assert [p["id"] for p in listing["profiles"]] == ["slow-one"]
+    assert listing["profiles"][0]["endpoint"] == "/api/ml-analyze"
+
+    download = client.get("/admin/profiles/slow-one", headers={"X-Admin-Token": "secret"})
+    assert download.status_code == 200 and download.data
+
+
+def test_sample_rate_profiles_api_requests(client, monkeypatch):
+    monkeypatch.setattr(app_module, "PROFILE_SAMPLE_RATE", 1.0)
+    assert "X-Profile-Id" in _post(client).headers
+    assert "X-Profile-Id" not in client.get("/health").headers
@@ -0,0 +1,97 @@
+import gzip
+import io
+import json
+
+import pytest
+
+import app as app_module
+from result_cache import ResultCache
+
+ANALYSIS = {
+    "ensemble_confidence": 87.5,
+    "recommendation": "Consult a <radiologist>",
+    "densenet_result": {
+        "top_prediction": "Effusion",
+        "confidence": 88.0,
+        "predictions": [{"class": "Effusion", "confidence": 88.0}],
+    },
+}
+
+
+class FakeEnsemble:
+    model_version = "test"
+
+    def __init__(self):
+        self.calls = 0
+
+    def ensemble_analysis(self, data):
+        self.calls += 1
+        return dict(ANALYSIS)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    analyzer = FakeEnsemble()
+    monkeypatch.setattr(app_module, "get_analyzer", lambda: analyzer)
+    monkeypatch.setattr(app_module, "result_cache", ResultCache(max_entries=8, disk_dir=str(tmp_path)))
+    app_module.app.config["TESTING"] = True
+    client = app_module.app.test_client()
+    client.analyzer = analyzer
+    return client
+
+
+def _post(client, query="", **headers):
+    return client.post(
+        "/api/ml-analyze" + query,
+        data={"image": (io.BytesIO(b"x"), "scan.png")},
+        headers=headers,
+    )
+
+
+def test_structured_mode_omits_html(client):
+    html = _post(client).get_json()
+    assert html["analysis"] == ANALYSIS
+    assert "Effusion" in html["result"]
+    # Values are escaped by the template
+    assert "&lt;radiologist&gt;" in html["result"]
+
+    for response in (
+        _post(client, "?format=structured"),
+        _post(client, Accept=f"{app_module.STRUCTURED_MEDIA_TYPE}, application/json;q=0.5"),
+    ):
+        assert response.get_json() == {"analysis": ANALYSIS}
+        assert "Accept" in response.headers["Vary"]
+
+    # Both forms came from one cached structured result
+    assert client.analyzer.calls == 1
+
+
+def test_wildcard_accept_still_gets_html(client):
+    assert "result" in _post(client, Accept="*/*").get_json()
+
+
+def test_large_responses_are_gzipped(client, monkeypatch):
+    monkeypatch.setattr(app_module, "COMPRESS_MIN_BYTES", 1000)
+    response = _post(client, **{"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data))["analysis"] == ANALYSIS
+
+    # The structured body is below the threshold and goes out as is
+    small = _post(client, "?format=structured", **{"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert small.get_json() == {"analysis": ANALYSIS}
+
+    assert "Content-Encoding" not in _post(client).headers
+
+
+def test_multiframe_dicom_is_flagged(client, tmp_path):
+    pytest.importorskip("pydicom")
+    from test_dicom_io import _dicom
+
+    path, _ = _dicom(tmp_path / "study.dcm", frames=3)
+    with open(path, "rb") as f:
+        response = client.post("/api/ml-analyze", data={"image": (io.BytesIO(f.read()), "study.dcm")})
+    body = response.get_json()
+    assert body["frames"] == 3 and body["frames_analyzed"] == 1
+    assert "batch" in body["warning"]
@@ -0,0 +1,75 @@
+import os
+import time
+
+from result_cache import ResultCache, make_key
+
+
+def test_make_key_depends_on_bytes_and_version():
+    assert make_key(b"abc", "m1") == make_key(b"abc", "m1")
+    assert make_key(b"abc", "m1") != make_key(b"abd", "m1")
+    assert make_key(b"abc", "m1") != make_key(b"abc", "m2")
+
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # a is now most recent
+    cache.set("c", {"v": 3})           # evicts b
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["memory_hits"] == 3
+    assert stats["disk_hits"] == 0
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.75
+
+
+def test_disk_round_trip_between_instances(tmp_path):
+    writer = ResultCache(max_entries=4, disk_dir=str(tmp_path))
+    writer.set("key", {"result": "<p>ok</p>", "analysis": {"x": 1.5}})
+
+    reader = ResultCache(max_entries=4, disk_dir=str(tmp_path))
+    assert reader.get("key") == {"result": "<p>ok</p>", "analysis": {"x": 1.5}}
+    assert reader.get("key") == {"result": "<p>ok</p>", "analysis": {"x": 1.5}}
+    stats = reader.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 0
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = ResultCache(max_entries=4, disk_dir=str(tmp_path), ttl_seconds=60)
+    cache.set("key", {"v": 1})
+
+    # Age the entry in both tiers
+    cache._entries["key"] = ({"v": 1}, time.time() - 1)
+    path = cache._disk_path("key")
+    old = time.time() - 120
+    os.utime(path, (old, old))
+
+    assert cache.get("key") is None
+    assert not os.path.exists(path)
+
+
+def test_prune_keeps_disk_tier_under_limit(tmp_path):
+    cache = ResultCache(max_entries=0, disk_dir=str(tmp_path), disk_max_bytes=10_000)
+    for i in range(10):
+        cache.set(f"key{i:02d}", {"blob": "x" * 2000})
+        path = cache._disk_path(f"key{i:02d}")
+        os.utime(path, (1000 + i, 1000 + i))
+    cache.ttl_seconds = 0
+    cache.prune()
+
+    remaining = sorted(
+        name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".json")
+    )
+    total = sum(os.path.getsize(cache._disk_path(name[:-5])) for name in remaining)
+    assert total <= 10_000
+    # Oldest entries go first
+    assert "key09.json" in remaining
+    assert "key00.json" not in remaining
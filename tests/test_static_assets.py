@@ -0,0 +1,54 @@
+import gzip
+
+import pytest
+
+import app as app_module
+from static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticManifest
+
+BUNDLE = b"console.log('mediscan');\n" * 200
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "index.html").write_text("<div id='root'></div>")
+    (tmp_path / "static" / "js" / "main.1a2b3c4d.js").write_bytes(BUNDLE)
+    (tmp_path / "logo.svg").write_text("<svg/>")
+
+    monkeypatch.setattr(app_module, "static_manifest", StaticManifest(str(tmp_path)))
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
+
+
+def test_hashed_assets_are_precompressed_and_immutable(client):
+    response = client.get("/static/js/main.1a2b3c4d.js", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == BUNDLE
+
+    plain = client.get("/static/js/main.1a2b3c4d.js", headers={"Accept-Encoding": "identity"})
+    assert plain.data == BUNDLE
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["ETag"] != response.headers["ETag"]
+
+    revalidated = client.get(
+        "/static/js/main.1a2b3c4d.js",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]},
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+
+def test_index_and_client_routes(client):
+    index = client.get("/")
+    assert index.data == b"<div id='root'></div>"
+    assert index.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+    assert client.get("/history/42").data == index.data
+    assert client.get("/logo.svg").mimetype == "image/svg+xml"
+
+
+def test_unknown_files_are_not_found(client):
+    assert client.get("/static/js/main.deadbeef.js").status_code == 404
+    assert client.get("/missing.png").status_code == 404
@@ -0,0 +1,70 @@
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import app as app_module
+from result_cache import ResultCache
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeCompletions:
+    def __init__(self, pieces, fail_after=None):
+        self.pieces = pieces
+        self.fail_after = fail_after
+
+    def create(self, messages, model, stream=False):
+        assert stream
+
+        def generate():
+            for i, piece in enumerate(self.pieces):
+                if i == self.fail_after:
+                    raise RuntimeError("stream broke")
+                yield _chunk(piece)
+
+        return generate()
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    monkeypatch.setattr(app_module, "ENV_GROQ_API_KEY", "test")
+    monkeypatch.setattr(app_module, "groq_available", lambda: True)
+    monkeypatch.setattr(app_module, "result_cache", ResultCache(max_entries=16))
+    monkeypatch.setattr(app_module, "run_ml_analysis", lambda data, html=True: {"result": "<p>ml</p>"})
+    app_module.app.config["TESTING"] = True
+    client = app_module.app.test_client()
+
+    def post(completions):
+        client_stub = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        monkeypatch.setattr(app_module, "get_groq_client", lambda: client_stub)
+        response = client.post("/api/analyze/stream", data={"image": (io.BytesIO(b"pixels"), "scan.png")})
+        assert response.mimetype == "text/event-stream"
+        events = []
+        for block in response.get_data(as_text=True).split("\n\n"):
+            lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if lines:
+                events.append((lines["event"], json.loads(lines["data"])))
+        return events
+
+    return post
+
+
+def test_tokens_then_final_html(stream):
+    events = stream(FakeCompletions(["Likely ", "**Pneumonia**"]))
+    assert events[:2] == [("token", {"text": "Likely "}), ("token", {"text": "**Pneumonia**"})]
+    event, payload = events[-1]
+    assert event == "done" and payload["source"] == "groq"
+    assert "<strong>Pneumonia</strong>" in payload["result"]
+
+    # The finished answer is cached, so a repeat is a single done event
+    assert stream(FakeCompletions([], fail_after=0)) == [("done", payload)]
+
+
+def test_failure_falls_back_to_ml(stream):
+    events = stream(FakeCompletions(["partial", "never sent"], fail_after=1))
+    assert [event for event, _ in events] == ["token", "fallback", "done"]
+    assert events[-1][1] == {"result": "<p>ml</p>", "source": "ml"}
@@ -6,6 +6,8 @@ Usage:
     python train_model.py --images_dir uploads --labels labels.csv --output model.joblib
 
 This script extracts lightweight features (mean, std, contrast, size) and trains a RandomForest classifier.
+Features are computed in parallel (--workers) and cached in an .npz file
+(--feature_cache) so retrains only featurize new or changed images.
 """
 import argparse
 import os
@@ -16,11 +18,11 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 import numpy as np
 
-from ml_model_lite import extract_features_for_ml
+from feature_cache import featurize
 
 
-def load_dataset(images_dir, labels_csv):
-    X = []
+def load_dataset(images_dir, labels_csv, workers=None, cache_path=None, use_hash=False):
+    paths = []
     y = []
     with open(labels_csv, newline='') as f:
         reader = csv.DictReader(f)
@@ -31,10 +33,12 @@ def load_dataset(images_dir, labels_csv):
             if not os.path.exists(img_path):
                 print(f"Warning: image not found {img_path}, skipping")
                 continue
-            feats = extract_features_for_ml(img_path)
-            X.append([feats['mean_intensity'], feats['std_intensity'], feats['contrast'], feats['width'], feats['height']])
+            paths.append(img_path)
             y.append(label)
-    return np.array(X), np.array(y)
+    X, ok = featurize(paths, workers=workers, cache_path=cache_path, use_hash=use_hash)
+    if not ok.all():
+        print(f"Warning: skipping {int((~ok).sum())} unreadable images")
+    return X[ok], np.array(y)[ok]
 
 
 def main():
@@ -42,9 +46,18 @@ def main():
     parser.add_argument('--images_dir', required=True)
     parser.add_argument('--labels', required=True, help='CSV with columns filename,label')
     parser.add_argument('--output', default='model.joblib')
+    parser.add_argument('--workers', type=int, default=None, help='Featurization processes (default: CPU count)')
+    parser.add_argument('--feature_cache', default=None,
+                        help='Feature cache file (default: <images_dir>/.feature_cache.npz, "" to disable)')
+    parser.add_argument('--hash', action='store_true', help='Key cached features by content hash instead of size/mtime')
     args = parser.parse_args()
 
-    X, y = load_dataset(args.images_dir, args.labels)
+    cache_path = args.feature_cache
+    if cache_path is None:
+        cache_path = os.path.join(args.images_dir, '.feature_cache.npz')
+
+    X, y = load_dataset(args.images_dir, args.labels, workers=args.workers,
+                        cache_path=cache_path or None, use_hash=args.hash)
     if len(X) == 0:
         print('No training data found. Exiting.')
         return
@@ -58,7 +71,11 @@ def main():
     print('Classification report:')
     print(classification_report(y_test, preds))
 
-    joblib.dump(clf, args.output)
+    # Write to a temp file and rename so a running server never sees a
+    # partially written artifact
+    tmp_output = f"{args.output}.tmp"
+    joblib.dump(clf, tmp_output)
+    os.replace(tmp_output, args.output)
     print(f'Saved model to {args.output}')
 
 